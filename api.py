@@ -2,8 +2,13 @@
 
 import os
 import asyncio
+import json
+import re
+import time
+from contextlib import aclosing, nullcontext
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import uvicorn
@@ -13,7 +18,11 @@ import logging
 # Load environment variables
 load_dotenv()
 
-from query_gpt import QueryGPT
+from query_gpt import QueryGPT, QueryResult
+from shared_state import FileLock
+from result_cache import normalize_sql
+from sql_cache import normalize_question
+from bigquery_inspector import QueryBudgetExceeded
 from intelligent_table_selector import IntelligentTableSelector
 
 # Configure logging
@@ -31,13 +40,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variables
+# Per-process state; anything that must be the same in every worker lives in
+# the schema catalog and query_gpt.shared_state
 query_gpt = None
 initialization_lock = asyncio.Lock()
 is_initialized = False
+leader_lock = None
+
+# Seconds between background schema refreshes (0 disables them)
+SCHEMA_REFRESH_INTERVAL = float(os.getenv("SCHEMA_REFRESH_INTERVAL", "900"))
+# Seconds between checks for a schema published by another worker (0 disables them)
+SCHEMA_SYNC_INTERVAL = float(os.getenv("SCHEMA_SYNC_INTERVAL", "5"))
+# Clients that send no session id share this one, as before sessions existed
+DEFAULT_SESSION = "default"
+# Older clients select a suggested table by appending this to the question
+TABLE_OPTION = re.compile(r'\s*\(use table option (\d+)\)?', re.IGNORECASE)
+
+# /query/batch: questions per request, and how many may be with Claude or the database at once
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "16"))
+BATCH_EXECUTION_CONCURRENCY = int(os.getenv("BATCH_EXECUTION_CONCURRENCY", "8"))
 
 class QueryRequest(BaseModel):
     question: str
+    dry_run: bool = False  # only generate the SQL and estimate its cost
+    explain: bool = False  # wait for the explanation instead of leaving it to /explain/{result_id}
+    session_id: Optional[str] = None  # client session the table suggestions belong to
+    table_option: Optional[int] = None  # answer from suggested table N of this session's /suggest-tables
 
 class QueryResponse(BaseModel):
     sql_query: str
@@ -45,6 +74,24 @@ class QueryResponse(BaseModel):
     explanation: str
     success: bool
     error: Optional[str] = None
+    truncated: bool = False  # results were cut off at MAX_RESULT_ROWS
+    estimated_bytes_processed: Optional[int] = None  # BigQuery dry-run estimate
+    estimated_cost_usd: Optional[float] = None
+    cache_hit: bool = False  # results came from the result cache
+    corrections: List[Dict[str, str]] = []  # misspelled tables/columns fixed before running
+    result_id: Optional[str] = None  # handle for GET /explain/{result_id}
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    dry_run: bool = False
+    explain: bool = False
+    session_id: Optional[str] = None
+
+class ExplainResponse(BaseModel):
+    result_id: str
+    explanation: str
+    success: bool
+    error: Optional[str] = None
 
 async def initialize_query_gpt():
     """Initialize QueryGPT asynchronously"""
@@ -87,9 +134,21 @@ async def initialize_query_gpt():
                 query_gpt = QueryGPT(database_url, anthropic_api_key)
                 logger.info("🚀 Initialized with PostgreSQL")
             
-            # Initialize schema in background to avoid timeout
+            # Warm start from the schema catalog when a previous run (or another worker) left
+            # one behind; otherwise the first worker to get the catalog lock analyzes the schema
+            # while the others wait for it
             logger.info("📊 Loading schema (this may take a moment)...")
-            query_gpt.schema_summary = query_gpt.analyze_schema()
+            warm_start = await asyncio.to_thread(query_gpt.load_or_analyze_schema)
+            
+            # One worker per host checks the database for schema changes; the others follow the catalog
+            global leader_lock
+            leader_lock = FileLock(f"{query_gpt.catalog.path}.leader")
+            if await asyncio.to_thread(leader_lock.acquire, False):
+                logger.info("👑 This worker keeps the schema up to date")
+                if warm_start:
+                    asyncio.create_task(revalidate_schema())
+            if SCHEMA_SYNC_INTERVAL > 0 or SCHEMA_REFRESH_INTERVAL > 0:
+                asyncio.create_task(schema_sync_loop())
             
             is_initialized = True
             logger.info("✅ QueryGPT API ready!")
@@ -98,12 +157,55 @@ async def initialize_query_gpt():
             logger.error(f"❌ Failed to initialize QueryGPT: {e}")
             raise
 
+async def revalidate_schema():
+    """Check the cached schema against the database after a warm start"""
+    try:
+        logger.info("🔄 Revalidating cached schema in background...")
+        changes = await asyncio.to_thread(query_gpt.refresh_schema)
+        logger.info(f"✅ Schema revalidated (version {changes['version']})")
+    except Exception as e:
+        logger.warning(f"⚠️ Schema revalidation failed, keeping cached schema: {e}")
+
+async def schema_sync_loop():
+    """
+    Keep this worker's schema current. The worker holding the leader lock
+    picks up new and changed tables every SCHEMA_REFRESH_INTERVAL seconds;
+    every worker reloads schemas published to the catalog by the others every
+    SCHEMA_SYNC_INTERVAL seconds, and a follower takes over the refreshes if
+    the leader process exits. Either interval can be 0 to turn that part off.
+    """
+    last_refresh = last_sync = time.monotonic()
+    tick = min(interval for interval in (SCHEMA_SYNC_INTERVAL, SCHEMA_REFRESH_INTERVAL) if interval > 0)
+    while True:
+        await asyncio.sleep(tick)
+        try:
+            if not leader_lock.held and await asyncio.to_thread(leader_lock.acquire, False):
+                logger.info("👑 This worker now keeps the schema up to date")
+            if leader_lock.held:
+                await asyncio.to_thread(query_gpt.shared_state.purge_expired)
+            now = time.monotonic()
+            if (leader_lock.held and SCHEMA_REFRESH_INTERVAL > 0
+                    and now - last_refresh >= SCHEMA_REFRESH_INTERVAL):
+                last_refresh = now
+                await asyncio.to_thread(query_gpt.refresh_schema)
+            elif SCHEMA_SYNC_INTERVAL > 0 and now - last_sync >= SCHEMA_SYNC_INTERVAL:
+                last_sync = now
+                await asyncio.to_thread(query_gpt.sync_from_catalog)
+        except Exception as e:
+            logger.warning(f"⚠️ Background schema refresh failed: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """Start initialization in background"""
     asyncio.create_task(initialize_query_gpt())
     logger.info("📋 Started initialization task")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled database connections"""
+    if query_gpt:
+        await query_gpt.aclose()
+
 @app.get("/")
 async def root():
     return {"message": "QueryGPT API is running", "initialized": is_initialized}
@@ -116,85 +218,167 @@ async def health_check():
         "initialized": is_initialized
     }
 
-@app.post("/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest):
-    try:
-        # Ensure initialization is complete
-        if not is_initialized:
-            await initialize_query_gpt()
-        
-        if not query_gpt:
-            raise HTTPException(status_code=503, detail="QueryGPT not initialized")
-        
-        question = request.question.strip()
-        if not question:
-            raise HTTPException(status_code=400, detail="Question cannot be empty")
-        
-        # Process query with timeout protection
-        try:
-            # Check if it's already SQL or natural language
-            if query_gpt.is_sql_query(question):
-                sql_query = question
-            else:
-                # Check if user is selecting a specific table option
-                table_context = query_gpt.schema_summary
-                if "(use table option" in question.lower():
-                    # Extract table number
-                    import re
-                    match = re.search(r'table option (\d+)', question.lower())
-                    if match and hasattr(query_gpt, '_last_table_suggestions'):
-                        table_num = int(match.group(1)) - 1
-                        if 0 <= table_num < len(query_gpt._last_table_suggestions):
-                            selected_table = query_gpt._last_table_suggestions[table_num]['table_info']
-                            # Create focused schema context for this specific table
-                            table_context = f"""
+@app.get("/stats")
+async def get_stats():
+    """Claude token usage (including prompt-cache reads/writes), result cache and result store size"""
+    if not query_gpt:
+        raise HTTPException(status_code=503, detail="QueryGPT not initialized")
+    
+    return {
+        "claude_tokens": query_gpt.claude_token_usage(),
+        "result_cache": query_gpt.result_cache.stats(),
+        "result_store": query_gpt.result_store.stats(),
+        # Requests that joined an identical Claude call or query already in flight
+        "coalesced": {
+            "claude": query_gpt.async_refiner.in_flight.stats(),
+            "execution": query_gpt.executions.stats()
+        }
+    }
+
+@app.get("/autocomplete")
+async def autocomplete(prefix: str = "", limit: int = 10):
+    """Table and column name completions for what the user has typed so far"""
+    if not query_gpt:
+        raise HTTPException(status_code=503, detail="QueryGPT not initialized")
+    
+    return {"suggestions": query_gpt.autocomplete(prefix, max(1, min(limit, 50)))}
+
+async def generate_sql(question: str, snapshot, session_id: str = None,
+                       table_option: int = None) -> tuple:
+    """
+    Turn a question into SQL against a pinned schema snapshot.
+
+    table_option picks one of the tables /suggest-tables last offered this
+    session; older clients append "(use table option N)" to the question instead.
+    Returns (sql_query, table_context); sql_query starts with "Error" if
+    Claude could not produce one.
+    """
+    if table_option is None and "(use table option" in question.lower():
+        match = TABLE_OPTION.search(question)
+        if match:
+            table_option = int(match.group(1))
+            question = (question[:match.start()] + question[match.end():]).strip()
+    
+    # Only the tables relevant to this question go into the prompts
+    table_context = query_gpt.schema_context_for(question, snapshot)
+    
+    # Check if it's already SQL or natural language
+    if query_gpt.is_sql_query(question):
+        return question, table_context
+    
+    # Check if user is selecting a specific table option
+    if table_option is not None:
+        table_name = await asyncio.to_thread(
+            query_gpt.table_suggestions.resolve, session_id or DEFAULT_SESSION, table_option
+        )
+        selected_table = snapshot.tables_by_name.get(table_name) if table_name else None
+        if selected_table is not None:
+            # Create focused schema context for this specific table
+            table_context = f"""
 BigQuery Table: {selected_table.full_name}
 Columns: {', '.join([col[0] for col in selected_table.columns])}
 Row count: {selected_table.row_count:,}
 
 Use this specific table to answer the query.
-Original query: {question.split('(use table')[0].strip()}
+Original query: {question}
 """
-                            # Clean the question to remove the table selection part
-                            question = question.split('(use table')[0].strip()
-                
-                # Convert natural language to SQL with timeout
-                sql_query = await asyncio.wait_for(
-                    asyncio.to_thread(
-                        query_gpt.refiner.convert_natural_language_to_sql,
-                        question, 
-                        table_context
-                    ),
-                    timeout=30.0  # 30 second timeout
+    
+    # Convert natural language to SQL with timeout
+    sql_query = await asyncio.wait_for(
+        query_gpt.async_refiner.convert_natural_language_to_sql(question, table_context),
+        timeout=30.0  # 30 second timeout
+    )
+    return sql_query, table_context
+
+async def estimate_sql(prepared, dry_run: bool = False):
+    """BigQuery dry-run estimate for a prepared query (None for PostgreSQL or when its result is cached)"""
+    # A cached result already carries its estimate, so skip the dry run
+    cached = None if dry_run else query_gpt.cached_result(prepared)
+    if cached:
+        return cached.estimate
+    return await asyncio.to_thread(query_gpt.estimate_query, prepared)
+
+def estimate_fields(estimate) -> Dict[str, Any]:
+    if estimate is None:
+        return {}
+    return {
+        "estimated_bytes_processed": estimate.bytes_processed,
+        "estimated_cost_usd": estimate.estimated_cost_usd
+    }
+
+async def answer_question(question: str, snapshot, dry_run: bool = False, explain: bool = False,
+                          llm_slots: asyncio.Semaphore = None,
+                          execution_slots: asyncio.Semaphore = None,
+                          explain_in_background: bool = None,
+                          session_id: str = None, table_option: int = None) -> QueryResponse:
+    """
+    Generate, estimate and run the SQL for one question against a pinned snapshot
+
+    llm_slots and execution_slots optionally cap how many questions may be in
+    the Claude and database stages at once (used by /query/batch);
+    explain_in_background overrides EXPLAIN_IN_BACKGROUND for this question.
+    session_id and table_option are passed on to generate_sql.
+    """
+    llm_slots = llm_slots or nullcontext()
+    execution_slots = execution_slots or nullcontext()
+    try:
+        async with llm_slots:
+            sql_query, table_context = await generate_sql(question, snapshot, session_id, table_option)
+        
+        if sql_query.startswith("Error"):
+            return QueryResponse(
+                sql_query="",
+                results=[],
+                explanation=sql_query,
+                success=False,
+                error=sql_query
+            )
+        
+        async with execution_slots:
+            # Estimate the scan before running anything (BigQuery only)
+            try:
+                # Fixed once here; the estimate, cache lookup and execution all reuse it
+                prepared = await asyncio.to_thread(query_gpt.prepare_query, sql_query, snapshot)
+                estimate = await estimate_sql(prepared, dry_run)
+            except Exception as e:
+                return QueryResponse(
+                    sql_query=sql_query,
+                    results=[],
+                    explanation=f"Error executing query: {e}",
+                    success=False,
+                    error=str(e)
                 )
-                
-                if sql_query.startswith("Error"):
-                    return QueryResponse(
-                        sql_query="",
-                        results=[],
-                        explanation=sql_query,
-                        success=False,
-                        error=sql_query
-                    )
             
-            # Execute the query with timeout
-            results, explanation = await asyncio.wait_for(
-                asyncio.to_thread(
-                    query_gpt.execute_and_explain_query,
-                    sql_query,
-                    query_gpt.schema_summary
-                ),
-                timeout=60.0  # 60 second timeout
-            )
+            if estimate is not None and estimate.over_budget:
+                message = str(QueryBudgetExceeded(estimate))
+                return QueryResponse(
+                    sql_query=sql_query,
+                    results=[],
+                    explanation=message,
+                    success=False,
+                    error=message,
+                    **estimate_fields(estimate)
+                )
             
-            if results is not None:
+            if dry_run:
                 return QueryResponse(
                     sql_query=sql_query,
-                    results=results,
-                    explanation=explanation,
-                    success=True
+                    results=[],
+                    explanation=estimate.describe() if estimate else "Dry run: query was not executed.",
+                    success=True,
+                    **estimate_fields(estimate)
                 )
-            else:
+            
+            # Execute the query with timeout
+            try:
+                result = await asyncio.wait_for(
+                    query_gpt.execute_query_async(prepared, snapshot, estimate),
+                    timeout=60.0  # 60 second timeout
+                )
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                explanation = f"Error executing query: {e}"
                 return QueryResponse(
                     sql_query=sql_query,
                     results=[],
@@ -202,16 +386,63 @@ Original query: {question.split('(use table')[0].strip()}
                     success=False,
                     error=explanation
                 )
-                
-        except asyncio.TimeoutError:
-            logger.error("Query processing timed out")
-            return QueryResponse(
-                sql_query="",
-                results=[],
-                explanation="Query processing timed out. Please try a simpler query.",
-                success=False,
-                error="Timeout"
-            )
+        
+        # Rows go back right away; the explanation is produced alongside them
+        # and picked up from /explain/{result_id}
+        result_id = await query_gpt.store_result(result, table_context, explain_in_background)
+        explanation = ""
+        if explain or result_id is None:
+            async with llm_slots:
+                explanation = await asyncio.wait_for(
+                    query_gpt.explain_result(result_id) if result_id else
+                    query_gpt.async_refiner.explain_query_results(
+                        result.sql, result.preview(), table_context, result.row_count
+                    ),
+                    timeout=60.0
+                )
+        
+        return QueryResponse(
+            sql_query=sql_query,
+            results=result.to_records(),
+            explanation=explanation,
+            success=True,
+            truncated=result.truncated,
+            cache_hit=result.cache_hit,
+            corrections=result.corrections,
+            result_id=result_id,
+            **estimate_fields(estimate)
+        )
+            
+    except asyncio.TimeoutError:
+        logger.error("Query processing timed out")
+        return QueryResponse(
+            sql_query="",
+            results=[],
+            explanation="Query processing timed out. Please try a simpler query.",
+            success=False,
+            error="Timeout"
+        )
+
+@app.post("/query", response_model=QueryResponse)
+async def process_query(request: QueryRequest):
+    try:
+        # Ensure initialization is complete
+        if not is_initialized:
+            await initialize_query_gpt()
+        
+        if not query_gpt:
+            raise HTTPException(status_code=503, detail="QueryGPT not initialized")
+        
+        question = request.question.strip()
+        if not question:
+            raise HTTPException(status_code=400, detail="Question cannot be empty")
+        
+        # Pin the schema for this request so a concurrent refresh cannot change it midway
+        snapshot = query_gpt.snapshot
+        
+        # Process query with timeout protection
+        return await answer_question(question, snapshot, request.dry_run, request.explain,
+                                     session_id=request.session_id, table_option=request.table_option)
     
     except HTTPException:
         raise
@@ -225,6 +456,182 @@ Original query: {question.split('(use table')[0].strip()}
             error=str(e)
         )
 
+def question_key(question: str) -> tuple:
+    """Questions with the same key are answered once per batch"""
+    if query_gpt.is_sql_query(question):
+        return ("sql", normalize_sql(question))
+    return ("question", normalize_question(question))
+
+@app.post("/query/batch")
+async def process_batch(request: BatchQueryRequest):
+    """
+    Answer many questions in one request, streamed as newline-delimited JSON:
+    one QueryResponse per line (plus its "index" and "question") in the order
+    they finish. Duplicate questions run once and are reported for each index.
+    """
+    if not is_initialized:
+        await initialize_query_gpt()
+    
+    if not query_gpt:
+        raise HTTPException(status_code=503, detail="QueryGPT not initialized")
+    
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
+    if len(request.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+    
+    # One schema for the whole batch
+    snapshot = query_gpt.snapshot
+    groups: Dict[tuple, List[int]] = {}
+    for index, question in enumerate(request.questions):
+        groups.setdefault(question_key(question.strip()), []).append(index)
+    llm_slots = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+    execution_slots = asyncio.Semaphore(BATCH_EXECUTION_CONCURRENCY)
+    logger.info(f"📦 Batch of {len(request.questions)} questions ({len(groups)} distinct)")
+    
+    async def answer(indexes: List[int]) -> tuple:
+        question = request.questions[indexes[0]].strip()
+        if not question:
+            response = QueryResponse(sql_query="", results=[], explanation="Question cannot be empty",
+                                     success=False, error="Question cannot be empty")
+            return indexes, response
+        try:
+            # Explanations only run when asked for (explain, or /explain later), so a large
+            # batch does not start a Claude call per question outside llm_slots
+            response = await answer_question(question, snapshot, request.dry_run, request.explain,
+                                             llm_slots, execution_slots, explain_in_background=False,
+                                             session_id=request.session_id)
+        except Exception as e:
+            logger.error(f"Error processing batch question: {e}")
+            response = QueryResponse(sql_query="", results=[], explanation=f"Internal server error: {e}",
+                                     success=False, error=str(e))
+        return indexes, response
+    
+    async def lines():
+        tasks = [asyncio.create_task(answer(indexes)) for indexes in groups.values()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indexes, response = await finished
+                item = response.model_dump()
+                for index in indexes:
+                    yield json.dumps({"index": index, "question": request.questions[index], **item}, default=str) + "\n"
+        finally:
+            # The client went away or the batch failed: stop the questions still running
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/query/stream")
+async def stream_query(request: QueryRequest):
+    """
+    Streaming variant of /query, as server-sent events: "sql" as soon as it is
+    generated, "estimate" (BigQuery), one "rows" event per result page, a
+    "result" summary, "explanation" text deltas and finally "done" (or "error")
+    """
+    if not is_initialized:
+        await initialize_query_gpt()
+    
+    if not query_gpt:
+        raise HTTPException(status_code=503, detail="QueryGPT not initialized")
+    
+    question = request.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    
+    # Pin the schema for this request so a concurrent refresh cannot change it midway
+    snapshot = query_gpt.snapshot
+    
+    async def events():
+        try:
+            sql_query, table_context = await generate_sql(question, snapshot, request.session_id,
+                                                          request.table_option)
+            if sql_query.startswith("Error"):
+                yield sse_event("error", {"error": sql_query})
+                return
+            yield sse_event("sql", {"sql_query": sql_query})
+            
+            prepared = await asyncio.to_thread(query_gpt.prepare_query, sql_query, snapshot)
+            estimate = await estimate_sql(prepared, request.dry_run)
+            if estimate is not None:
+                yield sse_event("estimate", estimate_fields(estimate))
+                if estimate.over_budget:
+                    yield sse_event("error", {"error": str(QueryBudgetExceeded(estimate))})
+                    return
+            if request.dry_run:
+                yield sse_event("done", {"success": True})
+                return
+            
+            result = QueryResult(sql_query, rows=[])
+            pages = query_gpt.stream_result_pages(prepared, result, snapshot, estimate)
+            async with aclosing(pages):
+                page_number = 0
+                async for page in pages:
+                    yield sse_event("rows", {"page": page_number, "rows": page})
+                    page_number += 1
+            # The explanation is streamed below, so the store should not start another one
+            result_id = await query_gpt.store_result(result, table_context, explain=False)
+            yield sse_event("result", {
+                "sql_query": result.sql,
+                "row_count": result.row_count,
+                "truncated": result.truncated,
+                "cache_hit": result.cache_hit,
+                "corrections": result.corrections,
+                "result_id": result_id
+            })
+            
+            explanation = query_gpt.async_refiner.stream_explanation(
+                result.sql, result.preview(), table_context, result.row_count
+            )
+            parts = []
+            async with aclosing(explanation):
+                async for text in explanation:
+                    parts.append(text)
+                    yield sse_event("explanation", {"text": text})
+            if result_id:
+                await query_gpt.save_explanation(result_id, ''.join(parts))
+            yield sse_event("done", {"success": True})
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            yield sse_event("error", {"error": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/explain/{result_id}", response_model=ExplainResponse)
+async def explain_result(result_id: str):
+    """Explanation of a result returned by /query, waiting for it if it is still being written"""
+    if not query_gpt:
+        raise HTTPException(status_code=503, detail="QueryGPT not initialized")
+    
+    try:
+        explanation = await asyncio.wait_for(query_gpt.explain_result(result_id), timeout=60.0)
+    except asyncio.TimeoutError:
+        logger.error("Explanation timed out")
+        return ExplainResponse(
+            result_id=result_id,
+            explanation="Explaining the results timed out.",
+            success=False,
+            error="Timeout"
+        )
+    
+    if explanation is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    success = not explanation.startswith("Error explaining results")
+    return ExplainResponse(
+        result_id=result_id,
+        explanation=explanation,
+        success=success,
+        error=None if success else explanation
+    )
+
 @app.post("/suggest-tables")
 async def suggest_tables(request: QueryRequest):
     """Suggest relevant tables based on user query"""
@@ -236,15 +643,22 @@ async def suggest_tables(request: QueryRequest):
             raise HTTPException(status_code=400, detail="Table suggestions only available for BigQuery")
         
         # Create table selector
-        selector = IntelligentTableSelector(query_gpt.db_inspector)
+        # Search the prebuilt index of the current schema snapshot instead of crawling BigQuery
+        selector = IntelligentTableSelector(query_gpt.db_inspector, query_gpt.snapshot.index)
         
         # Get suggestions
         tables, suggestions_text = selector.suggest_tables_for_query(request.question)
         
-        # Store suggestions in session (simplified - in production use proper session management)
-        query_gpt._last_table_suggestions = tables
+        # Store the suggested table names for this session, for a follow-up with table_option
+        session_id = request.session_id or DEFAULT_SESSION
+        await asyncio.to_thread(
+            query_gpt.table_suggestions.save,
+            session_id,
+            [t['table_info'].full_name for t in tables]
+        )
         
         return {
+            "session_id": session_id,
             "suggestions": suggestions_text,
             "tables": [
                 {
@@ -261,6 +675,25 @@ async def suggest_tables(request: QueryRequest):
         logger.error(f"Error suggesting tables: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/admin/refresh-schema")
+async def refresh_schema(force: bool = True):
+    """Refresh the schema now; force=false only re-fetches tables that changed"""
+    try:
+        if not is_initialized:
+            await initialize_query_gpt()
+            
+        if not query_gpt:
+            raise HTTPException(status_code=503, detail="QueryGPT not initialized")
+        
+        changes = await asyncio.to_thread(query_gpt.refresh_schema, force)
+        return {**changes, "success": True}
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error refreshing schema: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/schema")
 async def get_schema():
     try:
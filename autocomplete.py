@@ -0,0 +1,140 @@
+"""
+Prefix autocomplete over qualified table and column names
+"""
+import math
+from bisect import bisect_left
+from typing import Dict, List
+
+import numpy as np
+
+# How much one doubling of query usage counts against one doubling of row count
+USAGE_WEIGHT = 2.0
+# Tables rank ahead of their own columns when sizes are equal
+TABLE_BONUS = 0.5
+# Prefixes matching more entries than this get their best entries ranked ahead of time
+PRECOMPUTE_THRESHOLD = 2048
+PRECOMPUTE_TOP = 128
+# Only this many of the most queried tables are boosted
+USAGE_BOOST_TABLES = 64
+
+
+class AutocompleteIndex:
+    """
+    Sorted array of lower-cased names searched with bisect. Every table is
+    reachable as "dataset.table" and as its bare name, every column as
+    "table.column". Matches are ranked by table size, boosted by how often
+    the table has been queried. Short, common prefixes keep their best
+    entries precomputed so no keystroke has to rank a huge range.
+    """
+
+    def __init__(self, tables):
+        entries = []
+        for table in tables:
+            table_key = getattr(table, 'full_name', None) or table.name
+            dataset_id = getattr(table, 'dataset_id', None)
+            qualified = f"{dataset_id}.{table.table_id}" if dataset_id else table.name
+            short_name = qualified.split('.')[-1]
+            rows = getattr(table, 'row_count', None) or 0
+            size_score = math.log1p(rows)
+
+            entries.append((qualified.lower(), qualified, 'table', table_key, qualified, rows, size_score + TABLE_BONUS))
+            if short_name != qualified:
+                entries.append((short_name.lower(), qualified, 'table', table_key, qualified, rows, size_score + TABLE_BONUS))
+            for column in table.columns:
+                text = f"{short_name}.{column[0]}"
+                entries.append((text.lower(), text, 'column', table_key, qualified, rows, size_score))
+
+        entries.sort(key=lambda entry: entry[0])
+        self.keys: List[str] = [entry[0] for entry in entries]
+        self.entries = [entry[1:6] for entry in entries]  # (text, kind, table_key, table, row_count)
+        self.scores = np.array([entry[6] for entry in entries], dtype=np.float64)
+        # Entry positions per table key, in key order; a table's columns all share
+        # one score, so its best entries in any range are its table entries and
+        # then its first columns there
+        self.table_positions: Dict[str, List[int]] = {}
+        self.column_positions: Dict[str, List[int]] = {}
+        for i, entry in enumerate(self.entries):
+            positions = self.table_positions if entry[1] == 'table' else self.column_positions
+            positions.setdefault(entry[2], []).append(i)
+        self.top_by_prefix: Dict[str, np.ndarray] = {}
+        self._precompute('', 0, len(self.keys))
+
+    def _top(self, lo: int, hi: int, count: int) -> np.ndarray:
+        """Indices of the count highest-scoring entries in [lo, hi), best first"""
+        scores = self.scores[lo:hi]
+        if count < hi - lo:
+            top = np.argpartition(-scores, count - 1)[:count]
+        else:
+            top = np.arange(hi - lo)
+        return lo + top[np.argsort(-scores[top], kind='stable')]
+
+    def _precompute(self, prefix: str, lo: int, hi: int) -> None:
+        """Rank the best entries of every prefix whose range is too big to rank per request"""
+        if hi - lo <= PRECOMPUTE_THRESHOLD:
+            return
+        self.top_by_prefix[prefix] = self._top(lo, hi, PRECOMPUTE_TOP)
+        depth = len(prefix)
+        i = lo
+        while i < hi:
+            if len(self.keys[i]) <= depth:
+                i += 1
+                continue
+            child = prefix + self.keys[i][depth]
+            child_hi = bisect_left(self.keys, child + '\uffff', i, hi)
+            self._precompute(child, i, child_hi)
+            i = child_hi
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def complete(self, prefix: str, limit: int = 10, usage: Dict[str, int] = None) -> List[Dict]:
+        """
+        Best completions for a prefix (case-insensitive)
+
+        Args:
+            prefix: What the user has typed so far
+            limit: Maximum number of suggestions
+            usage: Query count per table key, used to boost frequently queried tables;
+                keep it to the top USAGE_BOOST_TABLES tables, since each one is looked up
+        """
+        prefix = prefix.strip().lower()
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\uffff')
+        if lo >= hi or limit <= 0:
+            return []
+
+        usage = usage or {}
+        # Used tables may outrank anything by size alone, so always consider their best entries
+        boosted, boosts = [], []
+        for table_key, count in usage.items():
+            columns = self.column_positions.get(table_key, ())
+            first = bisect_left(columns, lo)
+            entries = [i for i in self.table_positions.get(table_key, ()) if lo <= i < hi]
+            entries += columns[first:bisect_left(columns, hi, first, min(len(columns), first + limit))]
+            boosted += entries
+            boosts += [USAGE_WEIGHT * math.log2(1 + count)] * len(entries)
+        # Otherwise only the largest matches can make the cut; tables appear under two
+        # keys, hence the extra room for duplicates
+        wanted = min(hi - lo, 2 * limit)
+        boosted_set = set(boosted)
+        precomputed = self.top_by_prefix.get(prefix)
+        candidates = [] if precomputed is None else [
+            i for i in precomputed.tolist() if i not in boosted_set
+        ][:wanted]
+        if len(candidates) < wanted:
+            candidates = [i for i in self._top(lo, hi, min(hi - lo, wanted + len(boosted))).tolist()
+                          if i not in boosted_set]
+
+        ids = np.array(boosted + candidates, dtype=np.int64)
+        scores = self.scores[ids] + np.array(boosts + [0.0] * len(candidates))
+        suggestions, seen = [], set()
+        # Ties go to alphabetical order so suggestions don't reshuffle between keystrokes
+        for i in ids[np.lexsort((ids, -scores))].tolist():
+            text, kind, table_key, table, rows = self.entries[i]
+            if (text, kind) in seen:
+                continue
+            seen.add((text, kind))
+            suggestions.append({"text": text, "kind": kind, "table": table, "row_count": rows})
+            if len(suggestions) == limit:
+                break
+        return suggestions
@@ -1,9 +1,74 @@
 import os
+import re
 import json
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from typing import Dict, Iterator, List, Tuple, Optional
 from dataclasses import dataclass
+import pyarrow
+from google.api_core.exceptions import GoogleAPICallError
 from google.cloud import bigquery
+from google.cloud import bigquery_storage
 from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+
+
+# One query per dataset returning every table with all of its (nested) column paths.
+# Row counts and modification times come from the dataset's __TABLES__ meta-table,
+# since INFORMATION_SCHEMA.TABLE_STORAGE can only be queried per region.
+DATASET_METADATA_QUERY = """
+WITH selected AS (
+  SELECT table_name, table_type, creation_time
+  FROM `{dataset}.INFORMATION_SCHEMA.TABLES`
+  WHERE @all_tables OR table_name IN UNNEST(@table_names)
+  ORDER BY table_name
+  {limit}
+),
+columns AS (
+  SELECT
+    p.table_name,
+    ARRAY_AGG(STRUCT(p.field_path AS name, p.data_type AS data_type)
+              ORDER BY c.ordinal_position, p.field_path) AS columns
+  FROM `{dataset}.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS` AS p
+  JOIN `{dataset}.INFORMATION_SCHEMA.COLUMNS` AS c
+    ON c.table_name = p.table_name AND c.column_name = p.column_name
+  WHERE p.table_name IN (SELECT table_name FROM selected)
+  GROUP BY p.table_name
+),
+options AS (
+  SELECT
+    table_name,
+    MAX(IF(option_name = 'description', option_value, NULL)) AS description,
+    MAX(IF(option_name = 'labels', option_value, NULL)) AS labels
+  FROM `{dataset}.INFORMATION_SCHEMA.TABLE_OPTIONS`
+  WHERE table_name IN (SELECT table_name FROM selected)
+  GROUP BY table_name
+)
+SELECT
+  t.table_name,
+  t.table_type,
+  t.creation_time,
+  s.row_count,
+  TIMESTAMP_MILLIS(s.last_modified_time) AS last_modified_time,
+  o.description,
+  o.labels,
+  c.columns
+FROM selected AS t
+LEFT JOIN `{dataset}.__TABLES__` AS s ON s.table_id = t.table_name
+LEFT JOIN options AS o ON o.table_name = t.table_name
+LEFT JOIN columns AS c ON c.table_name = t.table_name
+ORDER BY t.table_name
+"""
+
+# The tables DATASET_METADATA_QUERY would load (same listing, order and limit),
+# with only their modification times, for cheap change detection.
+TABLE_MODIFIED_TIMES_QUERY = """
+SELECT t.table_name, TIMESTAMP_MILLIS(s.last_modified_time) AS last_modified_time
+FROM `{dataset}.INFORMATION_SCHEMA.TABLES` AS t
+LEFT JOIN `{dataset}.__TABLES__` AS s ON s.table_id = t.table_name
+ORDER BY t.table_name
+{limit}
+"""
 
 
 @dataclass
@@ -20,17 +85,60 @@ class BigQueryTableInfo:
     labels: Optional[Dict[str, str]]
 
 
+@dataclass
+class QueryCostEstimate:
+    bytes_processed: int  # from a dry run
+    estimated_cost_usd: float  # at on-demand pricing
+    maximum_bytes_billed: Optional[int]  # configured budget, if any
+    
+    @property
+    def over_budget(self) -> bool:
+        return bool(self.maximum_bytes_billed) and self.bytes_processed > self.maximum_bytes_billed
+    
+    def describe(self) -> str:
+        text = f"This query will scan about {self.bytes_processed / 1e9:,.2f} GB (~${self.estimated_cost_usd:,.4f})"
+        if self.maximum_bytes_billed:
+            text += f"; the limit is {self.maximum_bytes_billed / 1e9:,.2f} GB"
+        return text
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised instead of running a query whose dry run exceeds maximum_bytes_billed"""
+    
+    def __init__(self, estimate: QueryCostEstimate):
+        super().__init__(f"Query refused: {estimate.describe()}. Add filters or select fewer columns.")
+        self.estimate = estimate
+
+
 class BigQueryInspector:
-    def __init__(self, service_account_path: str = None, project_id: str = None):
+    # Default number of tables crawled per dataset
+    max_tables_per_dataset = 10
+    
+    def __init__(self, service_account_path: str = None, project_id: str = None,
+                 max_workers: int = None, request_timeout: float = None):
         """
         Initialize BigQuery client with service account credentials
         
         Args:
             service_account_path: Path to service account JSON file
             project_id: GCP project ID (if not in service account file)
+            max_workers: Size of the thread pool used to crawl table metadata
+            request_timeout: Deadline in seconds for each metadata API call
         """
         self.service_account_path = service_account_path or os.getenv('BIGQUERY_SERVICE_ACCOUNT_PATH')
         self.project_id = project_id or os.getenv('BIGQUERY_PROJECT_ID')
+        self.max_workers = max_workers or int(os.getenv('BIGQUERY_CRAWL_WORKERS', '16'))
+        self.request_timeout = request_timeout or float(os.getenv('BIGQUERY_REQUEST_TIMEOUT', '30'))
+        self.page_size = int(os.getenv('BIGQUERY_PAGE_SIZE', '5000'))
+        # Results at least this large are downloaded through the Storage Read API
+        self.storage_api_min_rows = int(os.getenv('BIGQUERY_STORAGE_API_MIN_ROWS', '50000'))
+        self.use_storage_api = os.getenv('BIGQUERY_USE_STORAGE_API', 'true').lower() == 'true'
+        self._bqstorage_client = None
+        # Queries whose dry run scans more than this are refused (0 = no limit)
+        self.maximum_bytes_billed = int(os.getenv('BIGQUERY_MAX_BYTES_BILLED', '0'))
+        self.price_per_tib = float(os.getenv('BIGQUERY_PRICE_PER_TIB', '6.25'))
+        # Failures from the most recent crawl, keyed by dataset or dataset.table
+        self.crawl_errors: Dict[str, str] = {}
         
         if not self.service_account_path:
             raise ValueError("BigQuery service account path is required (set BIGQUERY_SERVICE_ACCOUNT_PATH in .env)")
@@ -40,7 +148,7 @@ class BigQueryInspector:
         
         # Load service account credentials
         try:
-            credentials = service_account.Credentials.from_service_account_file(
+            self.credentials = credentials = service_account.Credentials.from_service_account_file(
                 self.service_account_path,
                 scopes=["https://www.googleapis.com/auth/bigquery"]
             )
@@ -56,13 +164,21 @@ class BigQueryInspector:
             
             self.client = bigquery.Client(credentials=credentials, project=self.project_id)
             
+            # Let every crawler thread keep its own HTTP connection alive
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            self.client._http.mount("https://", adapter)
+            
         except Exception as e:
             raise ConnectionError(f"Failed to initialize BigQuery client: {e}")
     
+    def _retry(self):
+        """Retry policy that gives up once the per-call deadline has passed"""
+        return bigquery.DEFAULT_RETRY.with_deadline(self.request_timeout)
+    
     def get_datasets(self) -> List[str]:
         """Get all dataset IDs in the project"""
         try:
-            datasets = list(self.client.list_datasets())
+            datasets = list(self.client.list_datasets(retry=self._retry(), timeout=self.request_timeout))
             return [dataset.dataset_id for dataset in datasets]
         except Exception as e:
             raise Exception(f"Failed to list datasets: {e}")
@@ -71,20 +187,31 @@ class BigQueryInspector:
         """Get all table IDs in a specific dataset"""
         try:
             dataset_ref = self.client.dataset(dataset_id)
-            tables = list(self.client.list_tables(dataset_ref))
+            tables = list(self.client.list_tables(dataset_ref, retry=self._retry(), timeout=self.request_timeout))
             return [table.table_id for table in tables]
         except Exception as e:
             raise Exception(f"Failed to list tables in dataset {dataset_id}: {e}")
     
+    @staticmethod
+    def _flatten_fields(fields, prefix: str = "") -> List[Tuple[str, str]]:
+        """Expand RECORD fields into dotted paths (e.g. address.city)"""
+        columns = []
+        for field in fields:
+            path = f"{prefix}{field.name}"
+            data_type = f"ARRAY<{field.field_type}>" if field.mode == "REPEATED" else field.field_type
+            columns.append((path, data_type))
+            if field.fields:
+                columns.extend(BigQueryInspector._flatten_fields(field.fields, f"{path}."))
+        return columns
+    
     def get_table_info(self, dataset_id: str, table_id: str) -> BigQueryTableInfo:
         """Get detailed information about a specific table"""
         try:
-            table_ref = self.client.get_table(f"{self.project_id}.{dataset_id}.{table_id}")
-            
-            # Get column information (limit to first 10 for efficiency)
-            columns = []
-            for field in table_ref.schema[:5]:  # First 5 columns
-                columns.append((field.name, field.field_type))
+            table_ref = self.client.get_table(
+                f"{self.project_id}.{dataset_id}.{table_id}",
+                retry=self._retry(),
+                timeout=self.request_timeout
+            )
             
             return BigQueryTableInfo(
                 full_name=f"{self.project_id}.{dataset_id}.{table_id}",
@@ -92,7 +219,7 @@ class BigQueryInspector:
                 table_id=table_id,
                 description=table_ref.description,
                 row_count=table_ref.num_rows,
-                columns=columns,
+                columns=self._flatten_fields(table_ref.schema),
                 table_type=table_ref.table_type,
                 created=table_ref.created.isoformat() if table_ref.created else None,
                 modified=table_ref.modified.isoformat() if table_ref.modified else None,
@@ -101,59 +228,310 @@ class BigQueryInspector:
         except Exception as e:
             raise Exception(f"Failed to get table info for {dataset_id}.{table_id}: {e}")
     
-    def get_all_tables_info(self, max_tables_per_dataset: int = 10) -> List[BigQueryTableInfo]:
+    @staticmethod
+    def _parse_option_string(value: Optional[str]) -> Optional[str]:
+        """Turn a TABLE_OPTIONS string literal such as "my table" into plain text"""
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value.strip('"')
+    
+    @staticmethod
+    def _parse_option_labels(value: Optional[str]) -> Optional[Dict[str, str]]:
+        """Turn a TABLE_OPTIONS labels literal like [STRUCT("k", "v")] into a dict"""
+        if not value:
+            return None
+        labels = dict(re.findall(r'STRUCT\("([^"]*)",\s*"([^"]*)"\)', value))
+        return labels or None
+    
+    def get_dataset_tables_info(self, dataset_id: str, table_names: List[str] = None,
+                                max_tables: int = None) -> List[BigQueryTableInfo]:
+        """
+        Get information about every table of a dataset with a single
+        INFORMATION_SCHEMA query instead of one get_table call per table
+        
+        Args:
+            dataset_id: Dataset to load
+            table_names: Only load these tables (default: all tables)
+            max_tables: Limit the number of tables loaded (in table name order)
+        """
+        try:
+            sql = DATASET_METADATA_QUERY.format(
+                dataset=f"{self.project_id}.{dataset_id}",
+                limit=f"LIMIT {int(max_tables)}" if max_tables is not None else ""
+            )
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter("all_tables", "BOOL", table_names is None),
+                bigquery.ArrayQueryParameter("table_names", "STRING", table_names or []),
+            ])
+            query_job = self.client.query(sql, job_config=job_config, timeout=self.request_timeout)
+            
+            tables = []
+            for row in query_job.result(timeout=self.request_timeout):
+                tables.append(BigQueryTableInfo(
+                    full_name=f"{self.project_id}.{dataset_id}.{row['table_name']}",
+                    dataset_id=dataset_id,
+                    table_id=row['table_name'],
+                    description=self._parse_option_string(row['description']),
+                    row_count=row['row_count'],
+                    columns=[(col['name'], col['data_type']) for col in row['columns'] or []],
+                    # INFORMATION_SCHEMA says "BASE TABLE" where the API says "TABLE"
+                    table_type=row['table_type'].replace('BASE TABLE', 'TABLE').replace(' ', '_'),
+                    created=row['creation_time'].isoformat() if row['creation_time'] else None,
+                    modified=row['last_modified_time'].isoformat() if row['last_modified_time'] else None,
+                    labels=self._parse_option_labels(row['labels'])
+                ))
+            return tables
+        except Exception as e:
+            raise Exception(f"Failed to load table metadata for dataset {dataset_id}: {e}")
+    
+    def select_datasets(self, datasets: List[str]) -> List[str]:
+        """Choose which datasets get crawled (subclasses may narrow this down)"""
+        return datasets
+    
+    def get_all_tables_info(self, max_tables_per_dataset: int = None) -> List[BigQueryTableInfo]:
         """
         Get information about all tables in all datasets
         
         Args:
             max_tables_per_dataset: Limit tables per dataset to avoid overwhelming results
         """
-        all_tables = []
-        
         try:
             datasets = self.get_datasets()
             print(f"Found {len(datasets)} datasets")
+            datasets = self.select_datasets(datasets)
+            return self.crawl_tables(datasets, max_tables_per_dataset or self.max_tables_per_dataset)
             
-            for dataset_id in datasets:
+        except Exception as e:
+            raise Exception(f"Failed to get all tables info: {e}")
+    
+    def get_table_modified_times(self, max_tables_per_dataset: int = None) -> Dict[str, Optional[str]]:
+        """
+        Get the last-modified timestamp of every table get_all_tables_info would crawl,
+        using one cheap query per dataset that lists tables the same way the crawl
+        does (INFORMATION_SCHEMA.TABLES, same order and limit). Datasets whose query fails
+        are left out and recorded in self.crawl_errors (by dataset id), so the
+        caller can keep what it already knew about them.
+        
+        Args:
+            max_tables_per_dataset: Limit tables per dataset (same meaning as in get_all_tables_info)
+        """
+        limit = max_tables_per_dataset or self.max_tables_per_dataset
+        
+        def dataset_modified_times(dataset_id: str) -> List[Tuple[str, Optional[str]]]:
+            sql = TABLE_MODIFIED_TIMES_QUERY.format(
+                dataset=f"{self.project_id}.{dataset_id}",
+                limit=f"LIMIT {int(limit)}" if limit else ""
+            )
+            query_job = self.client.query(sql, timeout=self.request_timeout)
+            return [
+                (f"{self.project_id}.{dataset_id}.{row['table_name']}",
+                 row['last_modified_time'].isoformat() if row['last_modified_time'] else None)
+                for row in query_job.result(timeout=self.request_timeout)
+            ]
+        
+        try:
+            datasets = self.select_datasets(self.get_datasets())
+        except Exception as e:
+            raise Exception(f"Failed to get table modification times: {e}")
+        
+        self.crawl_errors = {}
+        modified_times = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            listings = [(dataset_id, pool.submit(dataset_modified_times, dataset_id)) for dataset_id in datasets]
+            for dataset_id, future in listings:
                 try:
-                    tables = self.get_tables_in_dataset(dataset_id)
-                    print(f"Dataset {dataset_id}: {len(tables)} tables")
-                    
-                    # Limit tables per dataset
-                    tables_to_process = tables[:max_tables_per_dataset]
-                    
-                    for table_id in tables_to_process:
-                        try:
-                            table_info = self.get_table_info(dataset_id, table_id)
-                            all_tables.append(table_info)
-                        except Exception as e:
-                            print(f"Warning: Failed to get info for {dataset_id}.{table_id}: {e}")
-                            continue
-                            
+                    modified_times.update(future.result())
                 except Exception as e:
-                    print(f"Warning: Failed to process dataset {dataset_id}: {e}")
+                    print(f"Warning: Failed to check dataset {dataset_id} for changes: {e}")
+                    self.crawl_errors[dataset_id] = str(e)
+        return modified_times
+    
+    def get_tables_info(self, full_names: List[str]) -> List[BigQueryTableInfo]:
+        """
+        Re-fetch specific tables (project.dataset.table), one bulk query per dataset.
+        Tables of datasets whose query fails are left out and the failure is
+        recorded in self.crawl_errors.
+        """
+        by_dataset: Dict[str, List[str]] = {}
+        for full_name in full_names:
+            _, dataset_id, table_id = full_name.split('.', 2)
+            by_dataset.setdefault(dataset_id, []).append(table_id)
+        
+        tables = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            loads = [
+                (dataset_id, pool.submit(self.get_dataset_tables_info, dataset_id, table_names=table_ids))
+                for dataset_id, table_ids in by_dataset.items()
+            ]
+            for dataset_id, future in loads:
+                try:
+                    tables.extend(future.result())
+                except Exception as e:
+                    print(f"Warning: {e}")
+                    self.crawl_errors[dataset_id] = str(e)
+        return tables
+    
+    def crawl_tables(self, dataset_ids: List[str], max_tables_per_dataset: int = 10) -> List[BigQueryTableInfo]:
+        """
+        Fetch table metadata for many datasets concurrently
+        
+        Each dataset is loaded with one INFORMATION_SCHEMA query; datasets where
+        that query fails fall back to listing tables and calling get_table per
+        table. All calls share one bounded thread pool, and failures are
+        recorded in self.crawl_errors instead of aborting the crawl.
+        
+        Args:
+            dataset_ids: Datasets to crawl
+            max_tables_per_dataset: Limit tables per dataset to avoid overwhelming results
+        """
+        self.crawl_errors = {}
+        found = {}
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            bulk_loads = {
+                pool.submit(self.get_dataset_tables_info, dataset_id, max_tables=max_tables_per_dataset): (i, dataset_id)
+                for i, dataset_id in enumerate(dataset_ids)
+            }
+            listings = {}
+            lookups = {}
+            
+            for future in as_completed(bulk_loads):
+                i, dataset_id = bulk_loads[future]
+                try:
+                    tables = future.result()
+                except Exception as e:
+                    print(f"Warning: {e}; falling back to per-table lookups")
+                    listings[pool.submit(self.get_tables_in_dataset, dataset_id)] = (i, dataset_id)
                     continue
+                
+                print(f"Dataset {dataset_id}: {len(tables)} tables")
+                for j, table_info in enumerate(tables):
+                    found[(i, j)] = table_info
             
-            return all_tables
+            for future in as_completed(listings):
+                i, dataset_id = listings[future]
+                try:
+                    tables = future.result()
+                except Exception as e:
+                    print(f"Warning: Failed to process dataset {dataset_id}: {e}")
+                    self.crawl_errors[dataset_id] = str(e)
+                    continue
+                
+                print(f"Dataset {dataset_id}: {len(tables)} tables")
+                for j, table_id in enumerate(sorted(tables)[:max_tables_per_dataset]):
+                    future = pool.submit(self.get_table_info, dataset_id, table_id)
+                    lookups[future] = (i, j, f"{dataset_id}.{table_id}")
             
-        except Exception as e:
-            raise Exception(f"Failed to get all tables info: {e}")
+            for future in as_completed(lookups):
+                i, j, name = lookups[future]
+                try:
+                    found[(i, j)] = future.result()
+                except Exception as e:
+                    print(f"Warning: Failed to get info for {name}: {e}")
+                    self.crawl_errors[name] = str(e)
+        
+        if self.crawl_errors:
+            print(f"Loaded {len(found)} tables with {len(self.crawl_errors)} failures")
+        
+        # Keep dataset/table order stable regardless of completion order
+        return [found[key] for key in sorted(found)]
     
     def execute_query(self, query: str, max_results: int = 1000) -> List[Dict]:
         """Execute a BigQuery SQL query and return results"""
+        table, _ = self.execute_query_arrow(query, max_results)
+        return table.to_pylist()
+    
+    def _get_storage_client(self) -> bigquery_storage.BigQueryReadClient:
+        if self._bqstorage_client is None:
+            self._bqstorage_client = bigquery_storage.BigQueryReadClient(credentials=self.credentials)
+        return self._bqstorage_client
+    
+    def dry_run(self, query: str) -> QueryCostEstimate:
+        """Estimate how many bytes a query would scan, without running it"""
         try:
-            query_job = self.client.query(query)
-            results = query_job.result(max_results=max_results)
-            
-            # Convert to list of dictionaries
-            rows = []
-            for row in results:
-                rows.append(dict(row))
-            
-            return rows
-            
+            job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+            query_job = self.client.query(query, job_config=job_config, timeout=self.request_timeout)
+        except Exception as e:
+            raise Exception(f"Failed to dry-run query: {e}")
+        
+        bytes_processed = query_job.total_bytes_processed or 0
+        return QueryCostEstimate(
+            bytes_processed=bytes_processed,
+            estimated_cost_usd=bytes_processed / 2 ** 40 * self.price_per_tib,
+            maximum_bytes_billed=self.maximum_bytes_billed or None
+        )
+    
+    def stream_batches(self, query: str, estimate: QueryCostEstimate = None) -> Iterator[pyarrow.RecordBatch]:
+        """
+        Run a query and yield its results as Arrow record batches
+        
+        When a byte budget is configured the query is dry-run first (unless an
+        estimate is passed in) and refused with QueryBudgetExceeded if it would
+        scan too much; the budget is also set on the job as a hard limit.
+        
+        Results with at least storage_api_min_rows rows are read in parallel
+        streams through the BigQuery Storage Read API; smaller ones (or all of
+        them, if the service account lacks read-session permission) are paged
+        through the REST API.
+        """
+        job_config = bigquery.QueryJobConfig()
+        if self.maximum_bytes_billed:
+            estimate = estimate or self.dry_run(query)
+            if estimate.over_budget:
+                raise QueryBudgetExceeded(estimate)
+            job_config.maximum_bytes_billed = self.maximum_bytes_billed
+        
+        try:
+            query_job = self.client.query(query, job_config=job_config)
+            results = query_job.result(page_size=self.page_size)
         except Exception as e:
             raise Exception(f"Failed to execute query: {e}")
+        
+        if self.use_storage_api and (results.total_rows or 0) >= self.storage_api_min_rows:
+            batches = results.to_arrow_iterable(bqstorage_client=self._get_storage_client())
+            try:
+                first = next(batches, None)
+            except GoogleAPICallError as e:
+                print(f"Warning: Storage Read API unavailable, using REST paging instead: {e}")
+                self.use_storage_api = False
+                results = query_job.result(page_size=self.page_size)
+            else:
+                if first is not None:
+                    yield first
+                yield from batches
+                return
+        
+        yield from results.to_arrow_iterable()
+    
+    def execute_query_arrow(self, query: str, max_rows: int = None,
+                            estimate: QueryCostEstimate = None) -> Tuple[pyarrow.Table, bool]:
+        """
+        Execute a query and keep the results columnar
+        
+        Returns the Arrow table (at most max_rows rows) and whether more rows
+        were available.
+        """
+        batches = []
+        row_count = 0
+        with closing(self.stream_batches(query, estimate)) as stream:
+            for batch in stream:
+                batches.append(batch)
+                row_count += batch.num_rows
+                if max_rows is not None and row_count > max_rows:
+                    break
+        
+        table = pyarrow.Table.from_batches(batches) if batches else pyarrow.table({})
+        if max_rows is not None and row_count > max_rows:
+            return table.slice(0, max_rows), True
+        return table, False
+    
+    def stream_query(self, query: str) -> Iterator[Dict]:
+        """Yield result rows one at a time, converting one Arrow batch at a time"""
+        for batch in self.stream_batches(query):
+            yield from batch.to_pylist()
     
     def get_sample_data(self, dataset_id: str, table_id: str, limit: int = 5) -> List[Dict]:
         """Get sample data from a table"""
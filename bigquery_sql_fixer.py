@@ -2,78 +2,371 @@
 BigQuery SQL Fixer - Ensures SQL queries are properly formatted for BigQuery
 """
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Words that look like identifiers but are part of the language, never columns
+SQL_WORDS = {
+    'select', 'from', 'where', 'group', 'by', 'order', 'having', 'limit', 'offset', 'as', 'and',
+    'or', 'not', 'null', 'is', 'in', 'like', 'between', 'case', 'when', 'then', 'else', 'end',
+    'join', 'left', 'right', 'inner', 'outer', 'full', 'cross', 'on', 'using', 'distinct', 'asc',
+    'desc', 'union', 'all', 'with', 'over', 'partition', 'interval', 'true', 'false', 'cast',
+    'struct', 'array', 'unnest', 'except', 'replace', 'qualify', 'window', 'rows', 'range',
+    'preceding', 'following', 'current', 'row', 'unbounded', 'nulls', 'first', 'last', 'exists',
+    'any', 'some', 'intersect', 'escape', 'recursive', 'lateral', 'tablesample', 'system',
+    'percent', 'ignore', 'respect', 'safe', 'at', 'zone', 'for', 'of', 'into', 'values', 'set',
+    'insert', 'update', 'delete', 'merge', 'matched', 'create', 'drop', 'alter', 'table', 'view',
+    'if', 'ifnull', 'day', 'week', 'month', 'quarter', 'year', 'hour', 'minute', 'second',
+    'millisecond', 'microsecond', 'dayofweek', 'dayofyear', 'isoweek', 'isoyear', 'date',
+    'datetime', 'time', 'timestamp', 'int64', 'float64', 'numeric', 'bignumeric', 'bool',
+    'boolean', 'string', 'bytes', 'geography', 'json', 'int', 'integer', 'float', 'decimal',
+    'current_date', 'current_timestamp', 'current_datetime', 'current_time',
+}
+
+_TOKEN = re.compile(
+    r"""(?P<skip>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|--[^\n]*|/\*.*?\*/)"""
+    r"""|(?P<quoted>`[^`]+`)"""
+    r"""|(?P<ident>[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)""",
+    re.DOTALL
+)
+_LITERAL = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|--[^\n]*|/\*.*?\*/""", re.DOTALL)
+
+
+def _mask_literals(sql: str) -> str:
+    """
+    sql with the inside of string literals and all comments blanked out, so
+    patterns only see code; every offset stays the same
+    """
+    def blank(match):
+        text = match.group(0)
+        if text[0] in '\'"':
+            return text[0] + ' ' * (len(text) - 2) + text[-1]
+        return ' ' * len(text)
+    return _LITERAL.sub(blank, sql)
+
+
+def _squash(name: str) -> str:
+    """Case- and underscore-insensitive form, so daily_cost and dailyCost compare equal"""
+    return name.replace('_', '').lower()
+
+
+def _in_dataset(full_name: str, qualifier: str) -> bool:
+    """Whether project.dataset.table lives under a qualifier such as dataset or project.dataset"""
+    scope = qualifier.lower().split('.')
+    parts = full_name.lower().split('.')
+    return parts[-1 - len(scope):-1] == scope
+
+
+# Where a statement starts inside Claude's answer: a line opening with a
+# keyword, or failing that the first keyword that is a whole word
+_STATEMENT_LINE = re.compile(r'^\s*(WITH|SELECT|INSERT|UPDATE|DELETE)\b', re.IGNORECASE | re.MULTILINE)
+_STATEMENT_WORD = re.compile(r'\b(WITH|SELECT|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+_CTE_NAME = re.compile(r'(?:\bWITH|,)\s*(?:RECURSIVE\s+)?([A-Za-z_][A-Za-z0-9_]*)\s+AS\s*\(', re.IGNORECASE)
+# Implicit alias ending a select-list item: "SUM(amount) total," or "t.cost c FROM"
+_SELECT_ALIAS = re.compile(
+    r"""([A-Za-z0-9_.)\]'"`]+)\s+([A-Za-z_][A-Za-z0-9_]*)\s*(?=,|\bFROM\b)""", re.IGNORECASE
+)
+# UNNEST(...) x and UNNEST(...) AS x, allowing one level of nested parentheses
+_UNNEST_ALIAS = re.compile(
+    r'\bUNNEST\s*\((?:[^()]|\([^()]*\))*\)\s*(?:AS\s+)?([A-Za-z_][A-Za-z0-9_]*)', re.IGNORECASE
+)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance counting a swap of adjacent letters as one edit, giving up
+    (returning limit + 1) as soon as it must exceed limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before_previous[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+
+class IdentifierResolver:
+    """
+    Trigram index over a set of names, used to find the known name closest
+    to a misspelled one. Candidates share at least one trigram with the
+    input and are then checked by edit distance.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names: List[str] = []
+        self.exact: Dict[str, List[str]] = {}
+        self.trigrams: Dict[str, List[int]] = {}
+        for name in sorted(set(names)):
+            key = _squash(name)
+            self.exact.setdefault(key, []).append(name)
+            for gram in self._trigrams(key):
+                self.trigrams.setdefault(gram, []).append(len(self.names))
+            self.names.append(name)
+
+    @staticmethod
+    def _trigrams(key: str) -> set:
+        padded = f"^{key}$"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def max_distance(name: str) -> int:
+        """Edits tolerated for a name of this length (short names must match exactly)"""
+        if len(name) < 4:
+            return 0
+        if len(name) <= 6:
+            return 1
+        return 2 if len(name) <= 12 else 3
+
+    def resolve(self, name: str, allowed: Optional[set] = None) -> Optional[str]:
+        """
+        The single closest known name, or None when nothing is close enough or
+        two names are equally close
+
+        Args:
+            name: Identifier as written in the SQL
+            allowed: Restrict the answer to these names
+        """
+        key = _squash(name)
+        matches = [n for n in self.exact.get(key, []) if allowed is None or n in allowed]
+        if matches:
+            return matches[0] if len(matches) == 1 else None
+
+        limit = self.max_distance(key)
+        if limit == 0:
+            return None
+        shared: Dict[int, int] = {}
+        for gram in self._trigrams(key):
+            for i in self.trigrams.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+
+        best, best_distance, tied = None, limit + 1, False
+        for i in shared:
+            candidate = self.names[i]
+            if allowed is not None and candidate not in allowed:
+                continue
+            distance = edit_distance(key, _squash(candidate), limit)
+            if distance < best_distance:
+                best, best_distance, tied = candidate, distance, False
+            elif distance == best_distance and distance <= limit and candidate != best:
+                tied = True
+        if best is None or best_distance > limit or tied:
+            return None
+        return best
+
 
 class BigQuerySQLFixer:
-    def __init__(self, known_tables: List[str]):
+    def __init__(self, known_tables: List[str], table_columns: Dict[str, List[str]] = None):
         """
-        Initialize with a list of known table names in format: dataset.table
+        Initialize with the known tables and, optionally, their columns
+
+        Args:
+            known_tables: Fully qualified table names (project.dataset.table)
+            table_columns: Column names (including nested field paths) per full table name
         """
         self.known_tables = known_tables
-        self.table_map = {}
-        
-        # Build a map of table_name -> full_qualified_name
+        self.table_columns = table_columns or {}
+
+        # Every way a table can be written: project.dataset.table, dataset.table and table
+        self.table_map: Dict[str, List[str]] = {}
         for full_name in known_tables:
-            if '.' in full_name:
-                dataset, table = full_name.split('.', 1)
-                self.table_map[table.lower()] = full_name
-    
+            parts = full_name.split('.')
+            for i in range(len(parts)):
+                self.table_map.setdefault('.'.join(parts[i:]).lower(), []).append(full_name)
+
+        self.table_resolver = IdentifierResolver(name.split('.')[-1] for name in known_tables)
+        self.column_resolver = IdentifierResolver(
+            column for columns in self.table_columns.values() for column in columns
+        )
+
     def fix_sql(self, sql: str) -> str:
         """
         Fix SQL to ensure BigQuery compatibility
         """
+        return self.fix_sql_with_report(sql)[0]
+
+    def fix_sql_with_report(self, sql: str) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Fix SQL and report the identifier corrections made along the way,
+        as {"kind", "original", "corrected"} entries
+        """
         # Try to extract SQL from text that might contain explanations
         sql = sql.strip()
-        
-        # Look for SQL starting with common keywords
-        sql_keywords = ['SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE']
-        
-        # If the text contains SQL keywords, try to extract the SQL part
-        for keyword in sql_keywords:
-            if keyword in sql.upper():
-                # Find where the SQL starts
-                start_pos = sql.upper().find(keyword)
-                sql = sql[start_pos:]
-                break
-        
-        # Check if it's valid SQL now
-        if not any(sql.upper().startswith(keyword) for keyword in sql_keywords):
+
+        # If the text contains SQL keywords, extract the SQL part (WITH ... SELECT keeps
+        # its WITH; prose such as "without filters" does not count as a keyword)
+        start = _STATEMENT_LINE.search(sql) or _STATEMENT_WORD.search(sql)
+        if not start:
             # Return a default query if the SQL is not valid
-            return "SELECT 'Invalid SQL query provided' as error_message"
-        
-        # Fix table references
-        fixed_sql = self._fix_table_references(sql)
-        
+            return "SELECT 'Invalid SQL query provided' as error_message", []
+        sql = sql[start.start(1):]
+
+        corrections: List[Dict[str, str]] = []
+
+        # Fix table references, then columns of the tables that were found
+        fixed_sql, tables, complete = self._fix_table_references(sql, corrections)
+        if complete and tables and self.table_columns:
+            fixed_sql = self._fix_column_references(fixed_sql, tables, corrections)
+
         # Fix INFORMATION_SCHEMA references
         fixed_sql = self._fix_information_schema(fixed_sql)
-        
-        return fixed_sql
-    
-    def _fix_table_references(self, sql: str) -> str:
+
+        return fixed_sql, corrections
+
+    def resolve_table(self, name: str) -> Tuple[Optional[str], bool]:
+        """
+        Map a table reference to a known full table name
+
+        Returns:
+            (full_name, exact): full_name is None if the table is unknown or ambiguous
         """
-        Replace unqualified table names with fully qualified ones
+        matches = self.table_map.get(name.lower(), [])
+        if len(matches) == 1:
+            return matches[0], True
+        if matches:
+            return None, True
+
+        # Misspelled: fix the table part, keeping the dataset if one was given
+        qualifier, _, table = name.rpartition('.')
+        allowed = None
+        if qualifier:
+            allowed = {
+                full_name.split('.')[-1] for full_name in self.known_tables
+                if _in_dataset(full_name, qualifier)
+            }
+            if not allowed:
+                return None, False
+        table = self.table_resolver.resolve(table, allowed)
+        if table is None:
+            return None, False
+        candidates = [
+            full_name for full_name in self.table_map.get(table.lower(), [])
+            if not qualifier or _in_dataset(full_name, qualifier)
+        ]
+        return (candidates[0], False) if len(candidates) == 1 else (None, False)
+
+    def _fix_table_references(self, sql: str, corrections: List[Dict[str, str]]) -> Tuple[str, List[str], bool]:
+        """
+        Qualify and, where needed, correct the tables after FROM and JOIN
+
+        Returns:
+            (sql, tables referenced, whether every FROM/JOIN target was accounted for)
         """
-        # Pattern to find FROM and JOIN table references
-        from_pattern = r'(FROM|JOIN)\s+([a-zA-Z_][a-zA-Z0-9_]*)\b'
-        
+        # Matched against the masked SQL so "from x" inside a string or comment is left alone
+        masked = _mask_literals(sql)
+        cte_names = {name.lower() for name in _CTE_NAME.findall(masked)}
+        from_pattern = r'\b(FROM|JOIN)(\s+)(`[^`]+`|[A-Za-z_][A-Za-z0-9_\-]*(?:\.[A-Za-z_][A-Za-z0-9_\-]*){0,2})'
+        tables: List[str] = []
+        complete = True
+
         def replace_table(match):
-            keyword = match.group(1)
-            table_name = match.group(2)
-            
-            # Check if it's already qualified (contains a dot)
-            if '.' in table_name:
+            nonlocal complete
+            keyword, space, reference = match.groups()
+            name = reference.strip('`')
+            # EXTRACT(part FROM column) and IS DISTINCT FROM x are not table references
+            if re.search(r'(EXTRACT\s*\(\s*\w+|DISTINCT)\s*$', masked[:match.start()], flags=re.IGNORECASE):
+                return match.group(0)
+            if name.lower() in cte_names or name.upper() == 'UNNEST':
+                return match.group(0)
+            if name.upper().startswith('INFORMATION_SCHEMA') or '.INFORMATION_SCHEMA' in name.upper():
+                return match.group(0)
+
+            full_name, exact = self.resolve_table(name)
+            if full_name is None:
+                complete = False
+                return match.group(0)
+
+            tables.append(full_name)
+            if exact and name.count('.') >= 1:
+                # Already qualified (dataset.table resolves against the default project)
                 return match.group(0)
-            
-            # Look up the full name
-            full_name = self.table_map.get(table_name.lower())
-            if full_name:
-                return f"{keyword} {full_name}"
-            
-            # If not found, return as is
-            return match.group(0)
-        
-        return re.sub(from_pattern, replace_table, sql, flags=re.IGNORECASE)
-    
+            if not exact:
+                corrections.append({"kind": "table", "original": name, "corrected": full_name})
+            return f"{keyword}{space}`{full_name}`"
+
+        pieces = []
+        position = 0
+        for match in re.finditer(from_pattern, masked, flags=re.IGNORECASE):
+            pieces.append(sql[position:match.start()])
+            pieces.append(replace_table(match))
+            position = match.end()
+        pieces.append(sql[position:])
+        return ''.join(pieces), tables, complete
+
+    def _fix_column_references(self, sql: str, tables: List[str],
+                               corrections: List[Dict[str, str]]) -> str:
+        """
+        Correct misspelled column names, choosing only among the columns of
+        the tables the query reads. Identifiers that are keywords, functions,
+        aliases, CTE names or already-valid columns are left alone.
+        """
+        columns = {column for table in tables for column in self.table_columns.get(table, [])}
+        if not columns:
+            return sql
+        known = {column.lower() for column in columns}
+
+        # Names the query defines itself: column/table aliases, UNNEST aliases and CTEs
+        masked = _mask_literals(sql)
+        defined = {name.lower() for name in re.findall(r'\bAS\s+`?([A-Za-z_][A-Za-z0-9_]*)', masked, flags=re.IGNORECASE)}
+        defined |= {name.lower() for name in re.findall(
+            r'\b(?:FROM|JOIN)\s+`?[A-Za-z0-9_.\-]+`?\s+(?:AS\s+)?([A-Za-z_][A-Za-z0-9_]*)', masked, flags=re.IGNORECASE
+        )}
+        defined |= {
+            alias.lower() for before, alias in _SELECT_ALIAS.findall(masked)
+            if before.split('.')[-1].lower() not in SQL_WORDS or before.lower() == 'end'
+        }
+        # Elements of an unnested array; their fields are not table columns
+        unnested = {name.lower() for name in _UNNEST_ALIAS.findall(masked)} - SQL_WORDS
+        defined |= unnested
+        defined |= {name.lower() for name in _CTE_NAME.findall(masked)}
+        defined -= SQL_WORDS
+        table_words = {part.lower() for table in tables for part in table.split('.')}
+
+        pieces = []
+        position = 0
+        for match in _TOKEN.finditer(sql):
+            identifier = match.group('ident')
+            if identifier is None:
+                continue
+            # Functions are followed by "(" and FROM/JOIN targets were handled already
+            rest = masked[match.end():].lstrip()
+            before = masked[:match.start()].rstrip()
+            if rest.startswith('(') or re.search(r'\b(FROM|JOIN)$', before, flags=re.IGNORECASE):
+                continue
+
+            parts = identifier.split('.')
+            if len(parts) > 1 and parts[0].lower() in unnested:
+                continue
+            # alias.column / table.column: only the column part is checked
+            if len(parts) > 1 and (parts[0].lower() in defined or parts[0].lower() in table_words):
+                qualifier, column = parts[0] + '.', '.'.join(parts[1:])
+            else:
+                qualifier, column = '', identifier
+
+            lowered = column.lower()
+            if (lowered in known or lowered in SQL_WORDS or lowered in defined
+                    or lowered in table_words or lowered.split('.')[0] in defined):
+                continue
+
+            corrected = self.column_resolver.resolve(column, columns)
+            if corrected is None or corrected == column:
+                continue
+            correction = {"kind": "column", "original": column, "corrected": corrected}
+            if correction not in corrections:
+                corrections.append(correction)
+            pieces.append(sql[position:match.start()])
+            pieces.append(qualifier + corrected)
+            position = match.end()
+
+        pieces.append(sql[position:])
+        return ''.join(pieces)
+
     def _fix_information_schema(self, sql: str) -> str:
         """
         Fix INFORMATION_SCHEMA references for BigQuery
@@ -85,12 +378,12 @@ class BigQuerySQLFixer:
             sql,
             flags=re.IGNORECASE
         )
-        
+
         sql = re.sub(
             r'information_schema\.schemata',
             '`datastax-datalake.INFORMATION_SCHEMA.SCHEMATA`',
             sql,
             flags=re.IGNORECASE
         )
-        
-        return sql
\ No newline at end of file
+
+        return sql
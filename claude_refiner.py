@@ -1,21 +1,17 @@
 import anthropic
+import asyncio
+import hashlib
+import httpx
 import os
-from typing import Optional
+import threading
+from typing import AsyncIterator, Optional
 
+from singleflight import SingleFlight
+from sql_cache import SQLCache, normalize_question
 
-class ClaudeRefiner:
-    def __init__(self, api_key: str = None):
-        self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
-        if not self.api_key:
-            raise ValueError("Anthropic API key is required")
-        self.client = anthropic.Anthropic(api_key=self.api_key)
-    
-    def refine_schema_summary(self, schema_summary: str) -> str:
-        """Use Claude to refine and improve the schema summary"""
-        prompt = f"""
-Please refine and improve this database schema summary to make it more clear and user-friendly:
 
-{schema_summary}
+REFINE_SUMMARY_PROMPT = """
+Please refine and improve the database schema summary above to make it more clear and user-friendly.
 
 Please:
 1. Make the language more natural and conversational
@@ -26,25 +22,12 @@ Please:
 
 Return only the refined summary, no additional commentary.
 """
-        
-        try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=1000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
-        except Exception as e:
-            return f"Error refining summary: {e}\n\nOriginal summary:\n{schema_summary}"
-    
-    def generate_query_suggestions(self, schema_summary: str) -> str:
-        """Generate helpful SQL query suggestions based on the schema"""
-        prompt = f"""
-Based on this database schema:
 
-{schema_summary}
+# Separates the per-snapshot part of a schema context from the tables retrieved for one question
+RETRIEVED_TABLES_HEADER = "\n\n## Tables relevant to this question\n"
 
-Generate 5-7 useful SQL query examples that would be interesting to run against this database. Include:
+QUERY_SUGGESTIONS_PROMPT = """
+Based on the database schema above, generate 5-7 useful SQL query examples that would be interesting to run against this database. Include:
 1. Simple SELECT queries for each table
 2. JOIN queries if relationships are apparent
 3. Aggregate queries (COUNT, SUM, AVG, etc.)
@@ -52,26 +35,123 @@ Generate 5-7 useful SQL query examples that would be interesting to run against
 
 Format each query clearly with a brief explanation of what it does.
 """
-        
-        try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=1500,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
-        except Exception as e:
-            return f"Error generating query suggestions: {e}"
-    
-    def convert_natural_language_to_sql(self, natural_query: str, schema_context: str) -> str:
-        """Convert natural language query to SQL"""
+
+
+class BaseClaudeRefiner:
+    """Prompts, caches and token accounting shared by the sync and async refiners"""
+    model = "claude-3-haiku-20240307"
+
+    def __init__(self, api_key: str = None, artifact_cache=None, sql_cache: SQLCache = None):
+        """
+        Args:
+            api_key: Anthropic API key (defaults to ANTHROPIC_API_KEY)
+            artifact_cache: Optional SchemaCatalog used to persist schema-level Claude output
+            sql_cache: Generated-SQL cache, so several refiners can share one
+        """
+        self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
+        if not self.api_key:
+            raise ValueError("Anthropic API key is required")
+        self.sql_cache = sql_cache if sql_cache is not None else SQLCache()
+        self.artifact_cache = artifact_cache
+        # Running totals of input/output tokens, including prompt-cache reads and writes
+        self.token_usage = {
+            "requests": 0,
+            "input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "output_tokens": 0,
+        }
+        self._usage_lock = threading.Lock()
+
+    @staticmethod
+    def _schema_system(schema_context: str) -> list:
+        """
+        The schema as system blocks, the first marked for prompt caching.
+        Every method sends it byte-for-byte the same way and ahead of the
+        per-request text, so calls against the same schema share one cached
+        prefix. For a retrieved context only the part before
+        RETRIEVED_TABLES_HEADER is cached, since the tables after it change
+        with every question.
+        """
+        overview, header, retrieved = schema_context.partition(RETRIEVED_TABLES_HEADER)
+        system = [{
+            "type": "text",
+            "text": f"Given this database schema context:\n{overview}",
+            "cache_control": {"type": "ephemeral"},
+        }]
+        if header:
+            system.append({"type": "text", "text": header.lstrip() + retrieved})
+        return system
+
+    def _request(self, prompt: str, max_tokens: int, schema_context: str = None) -> dict:
+        """Arguments of a messages request, with the schema (if any) as the cached system prefix"""
+        request = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        if schema_context:
+            request["system"] = self._schema_system(schema_context)
+        return request
+
+    def _record_usage(self, usage) -> None:
+        if usage is None:
+            return
+        read = getattr(usage, 'cache_read_input_tokens', None) or 0
+        written = getattr(usage, 'cache_creation_input_tokens', None) or 0
+        with self._usage_lock:
+            self.token_usage["requests"] += 1
+            self.token_usage["input_tokens"] += usage.input_tokens or 0
+            self.token_usage["cache_creation_input_tokens"] += written
+            self.token_usage["cache_read_input_tokens"] += read
+            self.token_usage["output_tokens"] += usage.output_tokens or 0
+        if read or written:
+            print(f"🧠 Prompt cache: {read:,} tokens read, {written:,} written, {usage.input_tokens:,} uncached")
+
+    def _artifact_key(self, kind: str, schema_context: str, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{kind}\0{schema_context}\0{prompt}".encode()).hexdigest()
+
+    def _load_artifact(self, kind: str, prompt: str, schema_context: str) -> tuple:
+        """(key, stored answer or None) for a prompt whose answer depends only on its text"""
+        key = self._artifact_key(kind, schema_context, prompt)
+        if self.artifact_cache:
+            cached = self.artifact_cache.load_artifact(key)
+            if cached is not None:
+                print(f"⚡ Reusing cached {kind.replace('_', ' ')}")
+                return key, cached
+        return key, None
+
+    def _save_artifact(self, key: str, kind: str, text: str) -> None:
+        if self.artifact_cache:
+            self.artifact_cache.save_artifact(key, kind, text)
+
+    @staticmethod
+    def _sql_cache_schema(schema_context: str) -> str:
+        """
+        The part of a schema context that generated SQL is cached under: the
+        overview of a retrieved context, which is the same for every question
+        against one schema snapshot, or else the whole context
+        """
+        return schema_context.partition(RETRIEVED_TABLES_HEADER)[0]
+
+    def _cached_sql(self, natural_query: str, schema_context: str) -> Optional[str]:
+        """SQL generated earlier for the same or a near-identical question, if any"""
+        hit = self.sql_cache.get(natural_query, self._sql_cache_schema(schema_context))
+        if not hit:
+            return None
+        if hit.exact:
+            print("⚡ Reusing SQL from cache")
+        else:
+            print(f"⚡ Reusing SQL from similar question \"{hit.question}\" ({hit.similarity:.2f})")
+        return hit.sql
+
+    @staticmethod
+    def _sql_prompt(natural_query: str, schema_context: str) -> str:
         # Check if this is BigQuery based on schema context
         is_bigquery = "BigQuery" in schema_context or "dataset" in schema_context.lower()
-        
-        prompt = f"""
-Given this database schema context:
-{schema_context}
 
+        # The schema goes in the cached system block; only the question and rules vary here
+        return f"""
 User query: "{natural_query}"
 
 STEP 1: First, identify which tables from the schema are most relevant for this query.
@@ -100,26 +180,15 @@ CRITICAL INSTRUCTIONS:
 Example correct response:
 SELECT cloud_account, SUM(daily_cost) as total_cost FROM astra_fcpmo.tblDailyDedicatedDatabaseNodeCostSummary GROUP BY cloud_account ORDER BY total_cost DESC;
 """
-        
-        try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=500,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text.strip()
-        except Exception as e:
-            return f"Error converting query: {e}"
 
-    def explain_query_results(self, query: str, results: list, schema_context: str) -> str:
-        """Explain query results in human-friendly terms"""
+    @staticmethod
+    def _explanation_prompt(query: str, results: list, total_rows: int = None) -> str:
         results_preview = str(results[:5]) if len(results) > 5 else str(results)
-        
-        prompt = f"""
-Given this database schema context:
-{schema_context}
+        if total_rows is None:
+            total_rows = len(results)
 
-And this SQL query:
+        return f"""
+This SQL query:
 {query}
 
 Which returned these results (showing first 5 rows):
@@ -129,17 +198,182 @@ Please provide a clear, human-friendly explanation of:
 1. What the query is doing
 2. What the results mean
 3. Any interesting insights from the data
-4. Total number of results: {len(results)}
+4. Total number of results: {total_rows}
 
 Keep it conversational and accessible to non-technical users.
 """
-        
+
+
+class ClaudeRefiner(BaseClaudeRefiner):
+    def __init__(self, api_key: str = None, artifact_cache=None, sql_cache: SQLCache = None):
+        super().__init__(api_key, artifact_cache, sql_cache)
+        self.client = anthropic.Anthropic(api_key=self.api_key)
+
+    def _complete(self, prompt: str, max_tokens: int, schema_context: str = None) -> str:
+        """Send one request, with the schema (if any) as the cached system prefix"""
+        response = self.client.messages.create(**self._request(prompt, max_tokens, schema_context))
+        self._record_usage(getattr(response, 'usage', None))
+        return response.content[0].text
+
+    def _cached_completion(self, kind: str, prompt: str, max_tokens: int, schema_context: str) -> str:
+        """
+        Run a prompt whose answer depends only on its text, reusing a stored
+        answer for the same model and prompt when an artifact cache is set
+        """
+        key, cached = self._load_artifact(kind, prompt, schema_context)
+        if cached is not None:
+            return cached
+
+        text = self._complete(prompt, max_tokens, schema_context)
+        self._save_artifact(key, kind, text)
+        return text
+
+    def refine_schema_summary(self, schema_summary: str) -> str:
+        """Use Claude to refine and improve the schema summary"""
+        try:
+            return self._cached_completion("schema_summary", REFINE_SUMMARY_PROMPT, 1000, schema_summary)
+        except Exception as e:
+            return f"Error refining summary: {e}\n\nOriginal summary:\n{schema_summary}"
+
+    def generate_query_suggestions(self, schema_summary: str) -> str:
+        """Generate helpful SQL query suggestions based on the schema"""
+        try:
+            return self._cached_completion("query_suggestions", QUERY_SUGGESTIONS_PROMPT, 1500, schema_summary)
+        except Exception as e:
+            return f"Error generating query suggestions: {e}"
+
+    def convert_natural_language_to_sql(self, natural_query: str, schema_context: str) -> str:
+        """Convert natural language query to SQL, reusing SQL generated for the same or a near-identical question"""
+        cached = self._cached_sql(natural_query, schema_context)
+        if cached is not None:
+            return cached
+
+        try:
+            sql = self._complete(self._sql_prompt(natural_query, schema_context), 500, schema_context).strip()
+            self.sql_cache.put(natural_query, self._sql_cache_schema(schema_context), sql)
+            return sql
+        except Exception as e:
+            return f"Error converting query: {e}"
+
+    def explain_query_results(self, query: str, results: list, schema_context: str,
+                              total_rows: int = None) -> str:
+        """Explain query results in human-friendly terms (results may be just a preview of total_rows)"""
+        prompt = self._explanation_prompt(query, results, total_rows)
+        try:
+            return self._complete(prompt, 800, schema_context)
+        except Exception as e:
+            return f"Error explaining results: {e}"
+
+
+def async_anthropic_client(api_key: str, max_connections: int = None) -> anthropic.AsyncAnthropic:
+    """
+    AsyncAnthropic client on a single connection pool, meant to be shared by
+    every async refiner in a process (ANTHROPIC_MAX_CONNECTIONS caps the pool)
+    """
+    max_connections = max_connections or int(os.getenv('ANTHROPIC_MAX_CONNECTIONS', '500'))
+    http_client = anthropic.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    )
+    return anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client)
+
+
+class AsyncClaudeRefiner(BaseClaudeRefiner):
+    """
+    ClaudeRefiner for async code: the same prompts and caches, but requests
+    go through AsyncAnthropic so an in-flight call holds no thread
+    """
+
+    def __init__(self, api_key: str = None, artifact_cache=None, sql_cache: SQLCache = None,
+                 client: anthropic.AsyncAnthropic = None):
+        """
+        Args:
+            client: Shared AsyncAnthropic client (see async_anthropic_client); one is created if omitted
+        """
+        super().__init__(api_key, artifact_cache, sql_cache)
+        self.client = client or async_anthropic_client(self.api_key)
+        # Identical requests made at the same time share one Claude call
+        self.in_flight = SingleFlight()
+
+    async def aclose(self):
+        """Close the HTTP connection pool"""
+        await self.client.close()
+
+    async def _complete(self, prompt: str, max_tokens: int, schema_context: str = None) -> str:
+        """
+        Send one request, with the schema (if any) as the cached system prefix;
+        an identical request already in flight is joined instead of repeated
+        """
+        key = ("complete", max_tokens, self._artifact_key("complete", schema_context or "", prompt))
+        return await self.in_flight.do(key, lambda: self._send(prompt, max_tokens, schema_context))
+
+    async def _send(self, prompt: str, max_tokens: int, schema_context: str = None) -> str:
+        response = await self.client.messages.create(**self._request(prompt, max_tokens, schema_context))
+        self._record_usage(getattr(response, 'usage', None))
+        return response.content[0].text
+
+    async def _cached_completion(self, kind: str, prompt: str, max_tokens: int, schema_context: str) -> str:
+        """Async variant of ClaudeRefiner._cached_completion"""
+        key, cached = self._load_artifact(kind, prompt, schema_context)
+        if cached is not None:
+            return cached
+
+        text = await self._complete(prompt, max_tokens, schema_context)
+        self._save_artifact(key, kind, text)
+        return text
+
+    async def refine_schema_summary(self, schema_summary: str) -> str:
+        """Use Claude to refine and improve the schema summary"""
+        try:
+            return await self._cached_completion("schema_summary", REFINE_SUMMARY_PROMPT, 1000, schema_summary)
+        except Exception as e:
+            return f"Error refining summary: {e}\n\nOriginal summary:\n{schema_summary}"
+
+    async def generate_query_suggestions(self, schema_summary: str) -> str:
+        """Generate helpful SQL query suggestions based on the schema"""
+        try:
+            return await self._cached_completion("query_suggestions", QUERY_SUGGESTIONS_PROMPT, 1500, schema_summary)
+        except Exception as e:
+            return f"Error generating query suggestions: {e}"
+
+    async def convert_natural_language_to_sql(self, natural_query: str, schema_context: str) -> str:
+        """
+        Convert natural language query to SQL, reusing SQL generated for the same or a
+        near-identical question; concurrent calls for the same normalized question share one request.
+        The cache lookup (a similarity search under a lock) runs in a worker thread.
+        """
+        cached = await asyncio.to_thread(self._cached_sql, natural_query, schema_context)
+        if cached is not None:
+            return cached
+
+        key = ("sql", self.sql_cache.schema_hash(self._sql_cache_schema(schema_context)),
+               normalize_question(natural_query))
+        return await self.in_flight.do(key, lambda: self._generate_sql(natural_query, schema_context))
+
+    async def _generate_sql(self, natural_query: str, schema_context: str) -> str:
+        try:
+            sql = (await self._complete(self._sql_prompt(natural_query, schema_context), 500, schema_context)).strip()
+            self.sql_cache.put(natural_query, self._sql_cache_schema(schema_context), sql)
+            return sql
+        except Exception as e:
+            return f"Error converting query: {e}"
+
+    async def explain_query_results(self, query: str, results: list, schema_context: str,
+                                    total_rows: int = None) -> str:
+        """Explain query results in human-friendly terms (results may be just a preview of total_rows)"""
+        prompt = self._explanation_prompt(query, results, total_rows)
+        try:
+            return await self._complete(prompt, 800, schema_context)
+        except Exception as e:
+            return f"Error explaining results: {e}"
+
+    async def stream_explanation(self, query: str, results: list, schema_context: str,
+                                 total_rows: int = None) -> AsyncIterator[str]:
+        """Like explain_query_results, but yield the explanation text as Claude generates it"""
+        prompt = self._explanation_prompt(query, results, total_rows)
         try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=800,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
+            async with self.client.messages.stream(**self._request(prompt, 800, schema_context)) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                self._record_usage((await stream.get_final_message()).usage)
         except Exception as e:
-            return f"Error explaining results: {e}"
\ No newline at end of file
+            yield f"Error explaining results: {e}"
@@ -1,28 +1,146 @@
 import psycopg
-from typing import Dict, List, Tuple
+from psycopg_pool import AsyncConnectionPool, ConnectionPool, PoolTimeout
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
 import os
-from dataclasses import dataclass
+import re
+import uuid
+from contextlib import asynccontextmanager, closing, contextmanager
+from itertools import islice
+from dataclasses import dataclass, field
+
+
+# Every table with its columns, keys and indexes in one round trip.
+# Tables outside the public schema are named schema.table.
+FULL_SCHEMA_QUERY = """
+    WITH tables AS (
+        SELECT
+            c.oid,
+            CASE WHEN n.nspname = 'public' THEN c.relname
+                 ELSE n.nspname || '.' || c.relname END AS table_name
+        FROM pg_catalog.pg_class c
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p')
+        AND (
+            n.nspname = 'public'
+            OR (%(all_schemas)s
+                AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+                AND n.nspname NOT LIKE 'pg\\_%%')
+        )
+    )
+    SELECT
+        t.table_name,
+        (SELECT json_agg(json_build_array(a.attname, format_type(a.atttypid, NULL)) ORDER BY a.attnum)
+           FROM pg_catalog.pg_attribute a
+          WHERE a.attrelid = t.oid AND a.attnum > 0 AND NOT a.attisdropped) AS columns,
+        (SELECT json_agg(a.attname ORDER BY array_position(con.conkey, a.attnum))
+           FROM pg_catalog.pg_constraint con
+           JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = ANY(con.conkey)
+          WHERE con.conrelid = t.oid AND con.contype = 'p') AS primary_key,
+        (SELECT json_agg(json_build_array(
+                    a.attname,
+                    CASE WHEN fn.nspname = 'public' THEN fc.relname
+                         ELSE fn.nspname || '.' || fc.relname END,
+                    fa.attname))
+           FROM pg_catalog.pg_constraint con
+           CROSS JOIN LATERAL unnest(con.conkey, con.confkey) AS k(attnum, fattnum)
+           JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+           JOIN pg_catalog.pg_class fc ON fc.oid = con.confrelid
+           JOIN pg_catalog.pg_namespace fn ON fn.oid = fc.relnamespace
+           JOIN pg_catalog.pg_attribute fa ON fa.attrelid = con.confrelid AND fa.attnum = k.fattnum
+          WHERE con.conrelid = t.oid AND con.contype = 'f') AS foreign_keys,
+        (SELECT json_agg(pg_get_indexdef(i.indexrelid) ORDER BY i.indexrelid)
+           FROM pg_catalog.pg_index i
+          WHERE i.indrelid = t.oid) AS indexes
+    FROM tables t
+    ORDER BY t.table_name;
+"""
 
 
 @dataclass
 class TableInfo:
     name: str
     columns: List[Tuple[str, str]]  # (column_name, data_type)
+    primary_key: List[str] = field(default_factory=list)
+    foreign_keys: List[Tuple[str, str, str]] = field(default_factory=list)  # (column, referenced_table, referenced_column)
+    indexes: List[str] = field(default_factory=list)  # CREATE INDEX definitions
+
+
+def pool_settings() -> Dict:
+    """Connection pool and session settings from the environment"""
+    return {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'search_path': os.getenv('DB_SEARCH_PATH'),
+        'statement_timeout_ms': int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0')),
+        'itersize': int(os.getenv('DB_CURSOR_ITERSIZE', '2000')),
+    }
+
+
+# Data-modifying statements inside a WITH query (WITH x AS (INSERT ... RETURNING ...))
+DATA_MODIFYING = re.compile(r'\b(insert|update|delete|merge)\b', re.IGNORECASE)
+
+
+def is_streamable(query: str) -> bool:
+    """Whether a statement can run behind a server-side cursor (DECLARE ... CURSOR FOR)"""
+    words = query.split(None, 1)
+    if not words or words[0].lower() not in ('select', 'with', 'values', 'table'):
+        return False
+    return words[0].lower() != 'with' or not DATA_MODIFYING.search(query)
 
 
 class DatabaseInspector:
-    def __init__(self, connection_string: str = None):
+    def __init__(self, connection_string: str = None, **pool_options):
+        """
+        Open a connection pool shared by every query and metadata call
+        
+        Args:
+            connection_string: PostgreSQL URL (defaults to DATABASE_URL)
+            pool_options: Overrides for pool_settings() (min_size, max_size, max_lifetime,
+                          timeout, search_path, statement_timeout_ms, itersize)
+        """
         self.connection_string = connection_string or os.getenv('DATABASE_URL')
         if not self.connection_string:
             raise ValueError("Database connection string is required")
+        
+        settings = {**pool_settings(), **pool_options}
+        self.search_path = settings['search_path']
+        self.statement_timeout_ms = settings['statement_timeout_ms']
+        self.itersize = settings['itersize']
+        self.pool = ConnectionPool(
+            self.connection_string,
+            min_size=settings['min_size'],
+            max_size=settings['max_size'],
+            max_lifetime=settings['max_lifetime'],
+            timeout=settings['timeout'],
+            configure=self._configure_connection,
+            check=ConnectionPool.check_connection,
+            name="querygpt",
+            open=True
+        )
+    
+    def _configure_connection(self, conn: psycopg.Connection):
+        """Session setup run once for each new pooled connection"""
+        if self.search_path:
+            conn.execute("SELECT set_config('search_path', %s, false)", (self.search_path,))
+        if self.statement_timeout_ms:
+            conn.execute("SELECT set_config('statement_timeout', %s, false)", (str(self.statement_timeout_ms),))
+        conn.commit()
     
+    @contextmanager
     def connect(self):
-        """Create and return a database connection"""
+        """Borrow a connection from the pool; it is returned when the block exits"""
         try:
-            return psycopg.connect(self.connection_string)
-        except psycopg.Error as e:
+            with self.pool.connection() as conn:
+                yield conn
+        except PoolTimeout as e:
             raise ConnectionError(f"Failed to connect to database: {e}")
     
+    def close(self):
+        """Close every pooled connection"""
+        self.pool.close()
+    
     def get_table_names(self) -> List[str]:
         """Fetch all table names from the database"""
         with self.connect() as conn:
@@ -49,21 +167,154 @@ class DatabaseInspector:
                 """, (table_name,))
                 return cur.fetchall()
     
-    def get_full_schema(self) -> List[TableInfo]:
-        """Get complete schema information for all tables"""
-        table_names = self.get_table_names()
-        tables = []
+    def get_full_schema(self, all_schemas: bool = None) -> List[TableInfo]:
+        """
+        Get complete schema information for all tables in a single query
         
-        for table_name in table_names:
-            columns = self.get_table_schema(table_name)
-            tables.append(TableInfo(name=table_name, columns=columns))
+        Args:
+            all_schemas: Include every non-system schema, not just public
+                         (defaults to DATABASE_ALL_SCHEMAS)
+        """
+        if all_schemas is None:
+            all_schemas = os.getenv('DATABASE_ALL_SCHEMAS', 'false').lower() == 'true'
         
-        return tables
-    
-    def execute_query(self, query: str) -> List[Dict]:
-        """Execute a query and return results as list of dictionaries"""
         with self.connect() as conn:
             with conn.cursor() as cur:
+                cur.execute(FULL_SCHEMA_QUERY, {'all_schemas': all_schemas})
+                return [
+                    TableInfo(
+                        name=table_name,
+                        columns=[tuple(col) for col in columns or []],
+                        primary_key=primary_key or [],
+                        foreign_keys=[tuple(fk) for fk in foreign_keys or []],
+                        indexes=indexes or []
+                    )
+                    for table_name, columns, primary_key, foreign_keys, indexes in cur.fetchall()
+                ]
+    
+    def stream_query(self, query: str, itersize: int = None) -> Iterator[Dict]:
+        """
+        Yield result rows as dictionaries, one at a time
+        
+        SELECT-style statements run behind a named server-side cursor, so only
+        itersize rows are held in memory at once. Close the generator to stop
+        early; the transaction is committed (so the rows a write RETURNING
+        did not hand out are not rolled back with it), the cursor is closed
+        and the connection goes back to the pool.
+        """
+        with self.connect() as conn:
+            if is_streamable(query):
+                cur = conn.cursor(name=f"querygpt_{uuid.uuid4().hex}")
+                cur.itersize = itersize or self.itersize
+            else:
+                cur = conn.cursor()
+            with cur:
                 cur.execute(query)
+                if cur.description is None:
+                    return
                 columns = [desc[0] for desc in cur.description]
-                return [dict(zip(columns, row)) for row in cur.fetchall()]
\ No newline at end of file
+                try:
+                    for row in cur:
+                        yield dict(zip(columns, row))
+                except GeneratorExit:
+                    cur.close()
+                    conn.commit()
+                    raise
+    
+    def execute_query(self, query: str, max_rows: int = None) -> List[Dict]:
+        """Execute a query and return (at most max_rows) results as list of dictionaries"""
+        with closing(self.stream_query(query)) as rows:
+            return list(islice(rows, max_rows))
+
+
+class AsyncDatabaseInspector:
+    """Asyncio counterpart of DatabaseInspector for use inside the API event loop"""
+    
+    def __init__(self, connection_string: str = None, **pool_options):
+        """
+        Create (but do not open) an async connection pool
+        
+        Args:
+            connection_string: PostgreSQL URL (defaults to DATABASE_URL)
+            pool_options: Overrides for pool_settings(), as for DatabaseInspector
+        """
+        self.connection_string = connection_string or os.getenv('DATABASE_URL')
+        if not self.connection_string:
+            raise ValueError("Database connection string is required")
+        
+        settings = {**pool_settings(), **pool_options}
+        self.search_path = settings['search_path']
+        self.statement_timeout_ms = settings['statement_timeout_ms']
+        self.itersize = settings['itersize']
+        # The pool needs a running event loop, so it is opened lazily by open()
+        self.pool = AsyncConnectionPool(
+            self.connection_string,
+            min_size=settings['min_size'],
+            max_size=settings['max_size'],
+            max_lifetime=settings['max_lifetime'],
+            timeout=settings['timeout'],
+            configure=self._configure_connection,
+            check=AsyncConnectionPool.check_connection,
+            name="querygpt-async",
+            open=False
+        )
+    
+    async def _configure_connection(self, conn: psycopg.AsyncConnection):
+        """Session setup run once for each new pooled connection"""
+        if self.search_path:
+            await conn.execute("SELECT set_config('search_path', %s, false)", (self.search_path,))
+        if self.statement_timeout_ms:
+            await conn.execute("SELECT set_config('statement_timeout', %s, false)", (str(self.statement_timeout_ms),))
+        await conn.commit()
+    
+    async def open(self):
+        """Open the pool (safe to call more than once)"""
+        await self.pool.open()
+    
+    @asynccontextmanager
+    async def connect(self):
+        """Borrow a connection from the pool; it is returned when the block exits"""
+        await self.open()
+        try:
+            async with self.pool.connection() as conn:
+                yield conn
+        except PoolTimeout as e:
+            raise ConnectionError(f"Failed to connect to database: {e}")
+    
+    async def close(self):
+        """Close every pooled connection"""
+        await self.pool.close()
+    
+    async def stream_query(self, query: str, itersize: int = None) -> AsyncIterator[Dict]:
+        """Yield result rows one at a time from a server-side cursor (see DatabaseInspector.stream_query)"""
+        async with self.connect() as conn:
+            if is_streamable(query):
+                cur = conn.cursor(name=f"querygpt_{uuid.uuid4().hex}")
+                cur.itersize = itersize or self.itersize
+            else:
+                cur = conn.cursor()
+            async with cur:
+                await cur.execute(query)
+                if cur.description is None:
+                    return
+                columns = [desc[0] for desc in cur.description]
+                try:
+                    async for row in cur:
+                        yield dict(zip(columns, row))
+                except GeneratorExit:
+                    await cur.close()
+                    await conn.commit()
+                    raise
+    
+    async def execute_query(self, query: str, max_rows: int = None) -> List[Dict]:
+        """Execute a query and return (at most max_rows) results as list of dictionaries"""
+        rows = []
+        stream = self.stream_query(query)
+        try:
+            async for row in stream:
+                if max_rows is not None and len(rows) >= max_rows:
+                    break
+                rows.append(row)
+        finally:
+            await stream.aclose()
+        return rows
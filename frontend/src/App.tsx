@@ -9,6 +9,7 @@ interface QueryResult {
   explanation: string;
   success: boolean;
   error?: string;
+  result_id?: string;
 }
 
 interface Message {
@@ -32,6 +33,16 @@ interface TableSuggestionResponse {
   success: boolean;
 }
 
+// Identifies this tab to the server, which keeps table suggestions per session
+const getSessionId = (): string => {
+  let sessionId = sessionStorage.getItem('querygpt_session_id');
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    sessionStorage.setItem('querygpt_session_id', sessionId);
+  }
+  return sessionId;
+};
+
 function App() {
   const [question, setQuestion] = useState('');
   const [loading, setLoading] = useState(false);
@@ -70,6 +81,24 @@ function App() {
     scrollToBottom();
   }, [messages]);
 
+  // Rows arrive first; the explanation is fetched separately once it is ready
+  const loadExplanation = async (messageId: string, result: QueryResult) => {
+    if (!result.success || !result.result_id || result.explanation) return;
+    let explanation: string;
+    try {
+      const response = await axios.get(`/explain/${result.result_id}`);
+      explanation = response.data.explanation;
+    } catch (error) {
+      console.error('Error:', error);
+      explanation = 'Explanation unavailable.';
+    }
+    setMessages(prev => prev.map(message =>
+      message.id === messageId && message.result
+        ? { ...message, result: { ...message.result, explanation } }
+        : message
+    ));
+  };
+
   const handleTableChoice = async (tableNumber: number) => {
     if (!originalQuery || loading) return;
     
@@ -87,7 +116,9 @@ function App() {
       
       // Query with the specific table context
       const response = await axios.post('/query', {
-        question: `${originalQuery} (use table option ${tableNumber})`
+        question: originalQuery,
+        session_id: getSessionId(),
+        table_option: tableNumber
       });
       
       const newResult = response.data;
@@ -100,6 +131,7 @@ function App() {
       
       setMessages(prev => [...prev, assistantMessage]);
       setHistory(prev => [newResult, ...prev.slice(0, 19)]);
+      loadExplanation(assistantMessage.id, newResult);
     } catch (error) {
       console.error('Error:', error);
       const errorResult: QueryResult = {
@@ -142,7 +174,8 @@ function App() {
     try {
       // First, get table suggestions
       const suggestResponse = await axios.post('/suggest-tables', {
-        question: queryText
+        question: queryText,
+        session_id: getSessionId()
       });
       
       if (suggestResponse.data.success && suggestResponse.data.tables.length > 0) {
@@ -176,6 +209,7 @@ function App() {
         setMessages(prev => [...prev, assistantMessage]);
         setHistory(prev => [newResult, ...prev.slice(0, 19)]);
         setLoading(false);
+        loadExplanation(assistantMessage.id, newResult);
       }
     } catch (error) {
       console.error('Error:', error);
@@ -196,6 +230,7 @@ function App() {
         
         setMessages(prev => [...prev, assistantMessage]);
         setHistory(prev => [newResult, ...prev.slice(0, 19)]);
+        loadExplanation(assistantMessage.id, newResult);
       } catch (queryError) {
         const errorResult: QueryResult = {
           sql_query: '',
@@ -373,7 +408,7 @@ function App() {
 
                             <div className="explanation-section">
                               <h3>Explanation:</h3>
-                              <p className="explanation">{message.result.explanation}</p>
+                              <p className="explanation">{message.result.explanation || 'Explaining the results...'}</p>
                             </div>
 
                             {message.result.success && message.result.results.length > 0 && (
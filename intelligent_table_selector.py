@@ -3,13 +3,24 @@ Intelligent Table Selector for BigQuery
 Suggests relevant tables based on user query
 """
 
+import heapq
 from typing import List, Dict, Tuple
 from bigquery_inspector import BigQueryInspector
+from table_index import TableSearchIndex
 import re
 
+# Synonyms count for less than the words the user actually typed
+SYNONYM_WEIGHT = 0.5
+
 class IntelligentTableSelector:
-    def __init__(self, inspector: BigQueryInspector):
+    def __init__(self, inspector: BigQueryInspector, index: TableSearchIndex = None):
+        """
+        Args:
+            inspector: BigQuery inspector, used to build an index when none is given
+            index: Prebuilt BM25 index over the catalog (QueryGPT keeps one per schema snapshot)
+        """
         self.inspector = inspector
+        self.index = index
         
     def extract_keywords(self, query: str) -> List[str]:
         """Extract meaningful keywords from user query"""
@@ -39,62 +50,42 @@ class IntelligentTableSelector:
                     
         return list(set(expanded_keywords))
     
+    def get_index(self) -> TableSearchIndex:
+        """The index to search, built from a full crawl if none was supplied"""
+        if self.index is None:
+            print("🔍 Building table index...")
+            self.index = TableSearchIndex(self.inspector.get_all_tables_info())
+        return self.index
+    
     def search_tables(self, query: str, max_results: int = 5) -> List[Dict]:
         """Search for relevant tables based on query"""
-        keywords = self.extract_keywords(query)
-        print(f"🔍 Searching for tables with keywords: {', '.join(keywords)}")
-        
-        relevant_tables = []
-        
         try:
-            # Get all datasets
-            datasets = self.inspector.get_datasets()
+            index = self.get_index()
+            
+            # Words from the question count fully, synonym expansions at a discount
+            query_terms = index.query_terms(query)
+            weights = {term: 1.0 for term in query_terms}
+            for keyword in self.extract_keywords(query):
+                for term in index.query_terms(keyword):
+                    weights.setdefault(term, SYNONYM_WEIGHT)
+            print(f"🔍 Searching {len(index)} tables for: {', '.join(sorted(weights))}")
             
-            for dataset_id in datasets:
-                # Check if dataset name matches any keyword
-                dataset_score = sum(1 for kw in keywords if kw in dataset_id.lower())
-                
-                if dataset_score > 0 or any(kw in dataset_id.lower() for kw in ['cost', 'billing', 'usage']):
-                    try:
-                        # Get tables in this dataset
-                        tables = self.inspector.get_tables_in_dataset(dataset_id)
-                        
-                        for table_id in tables[:20]:  # Check first 20 tables per dataset
-                            table_score = dataset_score
-                            
-                            # Score based on table name
-                            table_name_lower = table_id.lower()
-                            table_score += sum(2 for kw in keywords if kw in table_name_lower)
-                            
-                            # Bonus for cost-related tables
-                            if any(term in table_name_lower for term in ['cost', 'billing', 'spend', 'charge']):
-                                table_score += 3
-                                
-                            if table_score > 0:
-                                try:
-                                    # Get table info
-                                    table_info = self.inspector.get_table_info(dataset_id, table_id)
-                                    
-                                    # Score based on column names
-                                    column_names = [col[0].lower() for col in table_info.columns]
-                                    column_score = sum(1 for kw in keywords for col in column_names if kw in col)
-                                    
-                                    total_score = table_score + column_score
-                                    
-                                    relevant_tables.append({
-                                        'table_info': table_info,
-                                        'score': total_score,
-                                        'matching_keywords': [kw for kw in keywords if kw in table_name_lower or any(kw in col for col in column_names)]
-                                    })
-                                except:
-                                    continue
-                    except:
-                        continue
-                        
-            # Sort by relevance score
-            relevant_tables.sort(key=lambda x: x['score'], reverse=True)
+            scores = index.score_terms(weights, weights)
+            ranked = heapq.nlargest(max_results, scores.items(), key=lambda item: item[1])
+            if not ranked:
+                return []
             
-            return relevant_tables[:max_results]
+            best = ranked[0][1]
+            return [
+                {
+                    'table_info': index.tables[doc_id],
+                    'score': round(score, 2),
+                    # 1-5 stars relative to the best match
+                    'relevance': max(1, round(5 * score / best)),
+                    'matching_keywords': index.matched_terms(doc_id, weights)
+                }
+                for doc_id, score in ranked
+            ]
             
         except Exception as e:
             print(f"❌ Error searching tables: {e}")
@@ -103,7 +94,6 @@ class IntelligentTableSelector:
     def format_table_suggestion(self, table_data: Dict) -> str:
         """Format a table suggestion for display"""
         table = table_data['table_info']
-        score = table_data['score']
         keywords = table_data['matching_keywords']
         
         suggestion = f"\n📊 **{table.full_name}**\n"
@@ -118,7 +108,7 @@ class IntelligentTableSelector:
             cols = [f"{col[0]}" for col in table.columns[:8]]
             suggestion += f"   Key columns: {', '.join(cols)}\n"
             
-        suggestion += f"   Relevance: {'⭐' * min(score, 5)} (matches: {', '.join(keywords)})\n"
+        suggestion += f"   Relevance: {'⭐' * table_data['relevance']} (matches: {', '.join(keywords)})\n"
         
         return suggestion
     
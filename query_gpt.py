@@ -1,69 +1,474 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
+import hashlib
 import os
 import sys
+import threading
+import time
+from contextlib import aclosing, closing
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from functools import cached_property, partial
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import pyarrow
 from dotenv import load_dotenv
 
 # Always load .env from the same folder as this script
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
 
-from database_inspector import DatabaseInspector
+from database_inspector import AsyncDatabaseInspector, DatabaseInspector, TableInfo, is_streamable
 from schema_summarizer import SchemaSummarizer
-from claude_refiner import ClaudeRefiner
+from claude_refiner import RETRIEVED_TABLES_HEADER, AsyncClaudeRefiner, ClaudeRefiner
+from bigquery_inspector import BigQueryTableInfo, QueryCostEstimate
 from limited_bigquery_inspector import LimitedBigQueryInspector
 from bigquery_summarizer import BigQuerySchemaSummarizer
 from bigquery_sql_fixer import BigQuerySQLFixer
+from schema_catalog import SchemaCatalog
+from table_index import TableSearchIndex
+from autocomplete import USAGE_BOOST_TABLES, AutocompleteIndex
+from result_cache import ResultCache, estimate_size, normalize_sql, referenced_tables
+from result_store import ResultStore, StoredResult
+from singleflight import SingleFlight
+from shared_state import FileLock, SharedState
+from suggestion_store import SuggestionStore
+
+
+# Table fields that change with the data rather than the schema
+STATS_FIELDS = ('row_count', 'modified')
+
+
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    """Immutable view of the loaded schema; refreshes replace it as a whole"""
+    tables: tuple
+    summary: str
+    sql_fixer: Optional[BigQuerySQLFixer]
+    version: int
+    loaded_at: float
+    index: Optional[TableSearchIndex] = None  # BM25 index over the tables, for retrieval
+    autocomplete: Optional[AutocompleteIndex] = None  # sorted table/column names, for prefix lookups
+    tables_by_name: Dict[str, Any] = field(default_factory=dict)  # full name -> table, for O(1) lookups
+    overview: str = ""  # leads every retrieved schema context, the same for every question
+
+
+@dataclass
+class QueryResult:
+    """Rows produced by one executed query"""
+    sql: str  # the SQL that actually ran (after fixes)
+    rows: Optional[List[Dict]] = None
+    truncated: bool = False  # more rows existed than max_result_rows
+    table: Any = None  # pyarrow.Table for columnar (BigQuery) results
+    estimate: Optional[QueryCostEstimate] = None  # BigQuery dry-run estimate
+    cache_hit: bool = False  # served from the result cache instead of the database
+    corrections: List[Dict[str, str]] = field(default_factory=list)  # identifiers the SQL fixer repaired
+
+    @property
+    def row_count(self) -> int:
+        return self.table.num_rows if self.rows is None and self.table is not None else len(self.rows or [])
+
+    def preview(self, limit: int = 5) -> List[Dict]:
+        """First few rows, without converting the whole columnar result"""
+        if self.rows is None and self.table is not None:
+            return self.table.slice(0, limit).to_pylist()
+        return (self.rows or [])[:limit]
+
+    def to_records(self) -> List[Dict]:
+        """
+        All rows as dictionaries; columnar results are converted here, at
+        serialization time, into a new list so cached results stay columnar
+        """
+        if self.rows is None:
+            return self.table.to_pylist() if self.table is not None else []
+        return self.rows
+
+
+@dataclass(frozen=True)
+class PreparedQuery:
+    """A query after the SQL fixer ran on it, with the tables it reads; prepared once per request"""
+    sql: str
+    corrections: tuple = ()  # identifiers the SQL fixer repaired
+    tables: tuple = ()  # (full name, modified timestamp) of every referenced table
+    read_only: bool = True  # only read-only queries are cached or share executions
+
+    @property
+    def cache_key(self) -> tuple:
+        """
+        Result cache key: the canonical SQL plus the modified timestamp of
+        every table it references, so a change to any of those tables (seen by
+        refresh_schema) makes old entries unreachable. PostgreSQL tables carry
+        no timestamp and rely on RESULT_CACHE_TTL.
+        """
+        return normalize_sql(self.sql), self.tables
+
+
+def take_rows(rows: Iterator[Dict], max_rows: int) -> Tuple[List[Dict], bool]:
+    """Consume at most max_rows rows and report whether any were left over"""
+    batch = list(islice(rows, max_rows + 1))
+    return batch[:max_rows], len(batch) > max_rows
 
 
 class QueryGPT:
     def __init__(self, database_url: str = None, anthropic_api_key: str = None, 
                  use_bigquery: bool = False, service_account_path: str = None, 
-                 bigquery_project_id: str = None):
+                 bigquery_project_id: str = None, catalog_path: str = None):
         if not anthropic_api_key:
             raise ValueError("❌ Error: Anthropic API key is required (set ANTHROPIC_API_KEY in .env)")
 
         self.use_bigquery = use_bigquery
-        self.refiner = ClaudeRefiner(anthropic_api_key)
+        self.catalog = SchemaCatalog(catalog_path)
+        # Generation of the catalog's published schema that the current snapshot came from
+        self.catalog_generation = 0
+        # The catalog doubles as a content-addressed cache for refined summaries and suggestions
+        self.refiner = ClaudeRefiner(anthropic_api_key, artifact_cache=self.catalog)
+        # Async twin for request handlers; in-flight calls hold no thread, and both refiners share one SQL cache
+        self.async_refiner = AsyncClaudeRefiner(anthropic_api_key, artifact_cache=self.catalog,
+                                                sql_cache=self.refiner.sql_cache)
+        self.snapshot = SchemaSnapshot((), "", None, 0, time.time())
+        self._refresh_lock = threading.Lock()
+        self.database_url = database_url
+        # Hard cap on rows kept in memory for a single query
+        self.max_result_rows = int(os.getenv('MAX_RESULT_ROWS', '10000'))
+        # Rows per page when results are streamed to the client
+        self.stream_page_size = int(os.getenv('STREAM_PAGE_SIZE', '500'))
+        self.result_cache = ResultCache()
+        # Identical queries running at the same time share one database round trip
+        self.executions = SingleFlight()
+        # Executed results waiting to be explained; explanations start as soon as a result is stored
+        # unless EXPLAIN_IN_BACKGROUND is off, in which case they run only when asked for
+        self.result_store = ResultStore()
+        self.explain_in_background = os.getenv('EXPLAIN_IN_BACKGROUND', 'true').lower() == 'true'
+        # How often each table has been queried, to rank autocomplete suggestions
+        self.table_usage = Counter()
+        # The most queried of those, rebuilt after each query so keystrokes never scan all usage
+        self.top_table_usage: Dict[str, int] = {}
+        self._usage_lock = threading.Lock()
+        # Tables put in front of Claude per question; larger schemas are retrieved, not sent whole
+        self.retrieval_top_k = int(os.getenv('SCHEMA_RETRIEVAL_TOP_K', '8'))
+        # Larger summaries are used as generated rather than sent to Claude for refinement
+        self.max_refine_chars = int(os.getenv('SCHEMA_REFINE_MAX_CHARS', '100000'))
+        # Size of the per-snapshot overview that leads (and is cached ahead of) retrieved contexts
+        self.overview_max_chars = int(os.getenv('SCHEMA_OVERVIEW_MAX_CHARS', '24000'))
         
         if use_bigquery:
             self.db_inspector = LimitedBigQueryInspector(service_account_path, bigquery_project_id)
             self.summarizer = BigQuerySchemaSummarizer()
             self.db_type = "BigQuery"
-            self.sql_fixer = None  # Will be initialized after schema is loaded
+            self.table_class = BigQueryTableInfo
+            self.catalog_source = f"bigquery:{self.db_inspector.project_id}"
         else:
             if not database_url:
                 raise ValueError("❌ Error: Database connection string is required (set DATABASE_URL in .env)")
             self.db_inspector = DatabaseInspector(database_url)
             self.summarizer = SchemaSummarizer()
             self.db_type = "PostgreSQL"
+            self.table_class = TableInfo
+            # Hash the connection string so credentials never land in the catalog
+            self.catalog_source = f"postgresql:{hashlib.sha256(database_url.encode()).hexdigest()[:16]}"
 
-    def analyze_schema(self, use_claude: bool = True) -> str:
-        print(f"🔍 Analyzing {self.db_type} schema...")
-        
+    @cached_property
+    def async_db_inspector(self) -> Optional[AsyncDatabaseInspector]:
+        """
+        Async pool for the API handlers, created on first use so CLI runs never
+        open it. Only PostgreSQL has a native async driver; BigQuery calls run in threads.
+        """
+        return None if self.use_bigquery else AsyncDatabaseInspector(self.database_url)
+
+    @cached_property
+    def shared_state(self) -> SharedState:
+        """State that must be the same in every worker process (stored results, table suggestions), opened on first use"""
+        return SharedState()
+
+    @cached_property
+    def table_suggestions(self) -> SuggestionStore:
+        return SuggestionStore(self.shared_state)
+
+    @property
+    def tables(self) -> tuple:
+        return self.snapshot.tables
+
+    @property
+    def schema_summary(self) -> str:
+        return self.snapshot.summary
+
+    @property
+    def sql_fixer(self) -> Optional[BigQuerySQLFixer]:
+        return self.snapshot.sql_fixer
+
+    def _publish_snapshot(self, tables: list, summary: str) -> SchemaSnapshot:
+        """Build a new snapshot and swap it in with a single reference assignment"""
+        sql_fixer = None
         if self.use_bigquery:
-            tables = self.db_inspector.get_all_tables_info()
             # Initialize SQL fixer with known table names
-            table_names = [table.full_name for table in tables]
-            self.sql_fixer = BigQuerySQLFixer(table_names)
-        else:
-            tables = self.db_inspector.get_full_schema()
-            
+            sql_fixer = BigQuerySQLFixer(
+                [table.full_name for table in tables],
+                {table.full_name: [column[0] for column in table.columns] for table in tables}
+            )
+        
+        snapshot = SchemaSnapshot(
+            tables=tuple(tables),
+            summary=summary,
+            sql_fixer=sql_fixer,
+            version=self.snapshot.version + 1,
+            loaded_at=time.time(),
+            index=TableSearchIndex(tables),
+            autocomplete=AutocompleteIndex(tables),
+            tables_by_name={self._table_key(table): table for table in tables},
+            overview=self._schema_overview(tables, summary)
+        )
+        # Requests that already grabbed the old snapshot keep using it
+        self.snapshot = snapshot
+        return snapshot
+
+    def _schema_overview(self, tables: list, summary: str) -> str:
+        """
+        The stable part of retrieved schema contexts: the rules and the
+        summary, or a list of the largest tables if the summary is too long
+        """
+        header = ""
+        if self.use_bigquery:
+            header = "IMPORTANT: This is a BigQuery database. All table references MUST use the format: " \
+                     "dataset_name.table_name\n\n"
+        if len(summary) <= self.overview_max_chars:
+            return header + summary
+        
+        lines = [f"{self.db_type} database with {len(tables)} tables; the largest are:"]
+        size = len(lines[0])
+        ranked = sorted(tables, key=lambda t: getattr(t, 'row_count', None) or 0, reverse=True)
+        for listed, table in enumerate(ranked):
+            line = f"- {self._table_key(table)} ({getattr(table, 'row_count', None) or 0:,} rows)"
+            if size + len(line) > self.overview_max_chars:
+                lines.append(f"... and {len(tables) - listed} more")
+                break
+            lines.append(line)
+            size += len(line) + 1
+        return header + "\n".join(lines)
+
+    def _summarize_tables(self, tables: list) -> str:
         basic_summary = self.summarizer.summarize_schema(tables)
         overview = self.summarizer.generate_schema_overview(tables)
-        full_summary = overview + "\n" + basic_summary
+        return overview + "\n" + basic_summary
 
-        if use_claude:
+    def _build_summary(self, tables: list, use_claude: bool = True) -> str:
+        full_summary = self._summarize_tables(tables)
+
+        if use_claude and len(full_summary) > self.max_refine_chars:
+            print(f"⚠️  Schema summary is {len(full_summary):,} characters; skipping Claude refinement")
+        elif use_claude:
             print("🤖 Refining summary with Claude...")
             # Add BigQuery-specific context to the summary
             if self.use_bigquery:
                 full_summary = f"IMPORTANT: This is a BigQuery database. All table references MUST use the format: dataset_name.table_name\n\n{full_summary}"
             refined_summary = self.refiner.refine_schema_summary(full_summary)
+            if not refined_summary.startswith("Error refining summary"):
+                self.catalog.save_summary(self.catalog_source, refined_summary)
             return refined_summary
 
         return full_summary
 
+    def analyze_schema(self, use_claude: bool = True) -> str:
+        print(f"🔍 Analyzing {self.db_type} schema...")
+        
+        if self.use_bigquery:
+            tables = self.db_inspector.get_all_tables_info()
+        else:
+            tables = self.db_inspector.get_full_schema()
+        
+        summary = self._build_summary(tables, use_claude)
+        self.catalog_generation = self.catalog.publish(self.catalog_source, tables, summary)
+        self._publish_snapshot(tables, summary)
+        return summary
+
+    def load_schema_from_catalog(self, use_claude: bool = True):
+        """
+        Warm start from the on-disk catalog instead of crawling the database.
+        Returns the schema summary, or None if the catalog has nothing usable.
+        """
+        if use_claude:
+            published = self.catalog.load_published(self.catalog_source, self.table_class)
+            if published is not None:
+                self.catalog_generation, tables, summary = published
+                self._publish_snapshot(tables, summary)
+                print(f"⚡ Loaded {len(tables)} tables from schema catalog {self.catalog.path}")
+                return summary
+        
+        tables = self.catalog.load_tables(self.catalog_source, self.table_class)
+        if not tables:
+            return None
+        
+        if use_claude:
+            summary = self.catalog.load_summary(self.catalog_source)
+            if summary is None:
+                return None
+        else:
+            summary = self._summarize_tables(tables)
+        
+        self._publish_snapshot(tables, summary)
+        print(f"⚡ Loaded {len(tables)} tables from schema catalog {self.catalog.path}")
+        return summary
+
+    def _schema_lock(self) -> FileLock:
+        """Cross-process lock serializing schema crawls against one catalog"""
+        return FileLock(f"{self.catalog.path}.lock")
+
+    def load_or_analyze_schema(self) -> bool:
+        """
+        Load the schema from the catalog, or analyze it if nothing is there yet.
+        Runs under the catalog's file lock, so worker processes starting together
+        crawl and refine the schema once between them; the rest load the result.
+        Returns True for a warm start from the catalog.
+        """
+        with self._schema_lock():
+            if self.load_schema_from_catalog() is not None:
+                return True
+            self.analyze_schema()
+            return False
+
+    def sync_from_catalog(self) -> bool:
+        """Adopt a schema another process published to the catalog; returns True if it changed"""
+        if self.catalog.generation(self.catalog_source) <= self.catalog_generation:
+            return False
+        published = self.catalog.load_published(self.catalog_source, self.table_class)
+        if published is None or published[0] <= self.catalog_generation:
+            return False
+        self.catalog_generation, tables, summary = published
+        self._publish_snapshot(tables, summary)
+        print(f"🔄 Loaded schema generation {self.catalog_generation} from catalog ({len(tables)} tables)")
+        return True
+
+    def schema_context_for(self, question: str, snapshot: SchemaSnapshot = None) -> str:
+        """
+        Schema context for one question. Small schemas get the full summary;
+        larger ones get the snapshot's overview followed by only the
+        retrieval_top_k best-matching tables with all their columns, so the
+        prompt stays the same size as the schema grows. The overview comes
+        first and is the same for every question, so it is what Claude caches.
+        """
+        snapshot = snapshot or self.snapshot
+        if not self.retrieval_top_k or len(snapshot.tables) <= self.retrieval_top_k or snapshot.index is None:
+            return snapshot.summary
+        
+        tables = [table for table, _ in snapshot.index.search(question, self.retrieval_top_k)]
+        if not tables:
+            # Nothing matched; fall back to the largest tables
+            tables = sorted(snapshot.tables, key=lambda t: getattr(t, 'row_count', None) or 0,
+                            reverse=True)[:self.retrieval_top_k]
+        print(f"🔎 Retrieved {len(tables)} of {len(snapshot.tables)} tables: "
+              f"{', '.join(self._table_key(t) for t in tables)}")
+        
+        header = f"{self.db_type} schema: the {len(tables)} tables most relevant to this question " \
+                 f"(out of {len(snapshot.tables)}).\n"
+        return snapshot.overview + RETRIEVED_TABLES_HEADER + header + "\n" + \
+            "\n".join(self.summarizer.summarize_table(table) for table in tables)
+
+    @staticmethod
+    def _table_key(table) -> str:
+        return getattr(table, 'full_name', None) or table.name
+
+    @staticmethod
+    def _table_structure(table):
+        """The table without its row count and modified time, to tell schema changes from data changes"""
+        return replace(table, **{name: None for name in STATS_FIELDS if hasattr(table, name)})
+
+    def refresh_schema(self, force: bool = False) -> dict:
+        """
+        Bring the schema snapshot up to date without a full re-analysis.
+
+        BigQuery tables are compared by their modified timestamps and only
+        new or changed tables are re-fetched; PostgreSQL tables are compared
+        by their column lists. The summary and SQL fixer are rebuilt only when
+        something changed (or when force is set), then swapped in atomically.
+        Tables whose row count or modified time is all that changed are
+        stored under the current summary, so data churn never triggers a new
+        Claude refinement.
+        
+        The crawl and summary run without the catalog's file lock, so workers
+        starting meanwhile still get a warm start; the lock is only taken to
+        publish the result.
+        """
+        with self._refresh_lock:
+            # Start from whatever another process has published
+            self.sync_from_catalog()
+            old_tables = {self._table_key(t): t for t in self.snapshot.tables}
+            
+            if force:
+                print(f"🔄 Forcing full {self.db_type} schema refresh...")
+                tables = self.db_inspector.get_all_tables_info() if self.use_bigquery else self.db_inspector.get_full_schema()
+            elif self.use_bigquery:
+                modified_times = self.db_inspector.get_table_modified_times()
+                stale = [
+                    name for name, modified in modified_times.items()
+                    if name not in old_tables or old_tables[name].modified != modified
+                ]
+                fetched = {t.full_name: t for t in self.db_inspector.get_tables_info(stale)} if stale else {}
+                # Tables that could not be re-fetched keep their previous entry
+                tables = [
+                    fetched.get(name) or old_tables[name]
+                    for name in modified_times
+                    if name in fetched or name in old_tables
+                ]
+                # So do whole datasets that could not be checked at all
+                failed = set(self.db_inspector.crawl_errors)
+                tables += [
+                    table for name, table in old_tables.items()
+                    if name not in modified_times and table.dataset_id in failed
+                ]
+            else:
+                tables = self.db_inspector.get_full_schema()
+            
+            new_tables = {self._table_key(t): t for t in tables}
+            changes = {
+                "added": sorted(set(new_tables) - set(old_tables)),
+                "removed": sorted(set(old_tables) - set(new_tables)),
+                "modified": sorted(
+                    name for name in set(new_tables) & set(old_tables)
+                    if self._table_structure(new_tables[name]) != self._table_structure(old_tables[name])
+                ),
+            }
+            stats_changed = [
+                name for name in set(new_tables) & set(old_tables)
+                if new_tables[name] != old_tables[name]
+            ]
+            
+            summary = None
+            if force or any(changes.values()):
+                print(f"🔄 Schema changed: {len(changes['added'])} added, "
+                      f"{len(changes['modified'])} modified, {len(changes['removed'])} removed")
+                summary = self._build_summary(tables)
+            elif stats_changed:
+                print(f"🔄 Row counts or timestamps changed for {len(stats_changed)} tables; keeping the summary")
+                summary = self.snapshot.summary
+            
+            if summary is not None:
+                with self._schema_lock():
+                    self.catalog_generation = self.catalog.publish(self.catalog_source, tables, summary)
+                self._publish_snapshot(tables, summary)
+            
+            changes["version"] = self.snapshot.version
+            return changes
+
+    def close(self):
+        """Release database resources (the PostgreSQL connection pool)"""
+        if hasattr(self.db_inspector, 'close'):
+            self.db_inspector.close()
+
+    async def aclose(self):
+        """Release the async connection pools (database and Claude) as well as the blocking one"""
+        if self.__dict__.get('async_db_inspector') is not None:
+            await self.async_db_inspector.close()
+        await self.async_refiner.aclose()
+        await asyncio.to_thread(self.close)
+
+    def claude_token_usage(self) -> Dict[str, int]:
+        """Token totals across the sync and async refiners"""
+        return {
+            name: count + self.async_refiner.token_usage[name]
+            for name, count in self.refiner.token_usage.items()
+        }
+
     def suggest_queries(self, schema_summary: str) -> str:
         print("💡 Generating query suggestions...")
         return self.refiner.generate_query_suggestions(schema_summary)
@@ -74,28 +479,319 @@ class QueryGPT:
         text_lower = text.lower().strip()
         return any(text_lower.startswith(keyword) for keyword in sql_keywords)
 
-    def execute_and_explain_query(self, query: str, schema_context: str) -> tuple:
+    def _fix_query(self, query: str, snapshot: SchemaSnapshot) -> Tuple[str, List[Dict[str, str]]]:
+        """Fix SQL for BigQuery if needed, returning the identifiers that were corrected"""
+        if not (self.use_bigquery and snapshot.sql_fixer):
+            return query, []
+        
+        original_query = query
+        query, corrections = snapshot.sql_fixer.fix_sql_with_report(query)
+        for correction in corrections:
+            print(f"🔧 Corrected {correction['kind']} {correction['original']} -> {correction['corrected']}")
+        if original_query != query:
+            print(f"🔧 Fixed SQL: {query[:100]}...")
+        return query, corrections
+
+    def prepare_query(self, query: str, snapshot: SchemaSnapshot = None) -> PreparedQuery:
+        """
+        Fix the SQL and look up the tables it references, once; the estimate,
+        cache and execution methods all accept the result in place of the SQL
+        """
+        snapshot = snapshot or self.snapshot
+        sql, corrections = self._fix_query(query, snapshot)
+        return PreparedQuery(sql, tuple(corrections), referenced_tables(sql, snapshot.tables), is_streamable(sql))
+
+    def _prepared(self, query, snapshot: SchemaSnapshot) -> PreparedQuery:
+        return query if isinstance(query, PreparedQuery) else self.prepare_query(query, snapshot)
+
+    def stream_query(self, query, snapshot: SchemaSnapshot = None) -> Iterator[Dict]:
+        """Run a query and yield its rows incrementally as the database returns them"""
+        query = self._prepared(query, snapshot or self.snapshot)
+        return self.db_inspector.stream_query(query.sql)
+
+    def estimate_query(self, query, snapshot: SchemaSnapshot = None) -> Optional[QueryCostEstimate]:
+        """Dry-run a BigQuery query to see how much it would scan (None for PostgreSQL)"""
+        if not self.use_bigquery:
+            return None
+        
+        query = self._prepared(query, snapshot or self.snapshot)
+        estimate = self.db_inspector.dry_run(query.sql)
+        print(f"💰 {estimate.describe()}")
+        return estimate
+
+    def cached_result(self, query, snapshot: SchemaSnapshot = None) -> Optional[QueryResult]:
+        """Return the cached result for a query (SQL or PreparedQuery) without running it, if there is one"""
+        query = self._prepared(query, snapshot or self.snapshot)
+        if not query.read_only:
+            return None
+        cached = self.result_cache.get(query.cache_key)
+        return replace(cached, cache_hit=True) if cached else None
+
+    def _cache_result(self, result: QueryResult, query: PreparedQuery) -> QueryResult:
+        """Cache a read's result; a write instead drops the cached reads of the tables it touched"""
+        if query.read_only:
+            self.result_cache.put(query.cache_key, result, estimate_size(result))
+        elif query.tables:
+            self.result_cache.invalidate(name for name, _ in query.tables)
+        else:
+            # Touched no table we know of, so any cached read could be stale
+            self.result_cache.clear()
+        return result
+
+    def _record_usage(self, result: QueryResult, query: PreparedQuery) -> QueryResult:
+        """Count the tables a successful query touched"""
+        if not query.tables:
+            return result
+        with self._usage_lock:
+            self.table_usage.update(name for name, _ in query.tables)
+            self.top_table_usage = dict(self.table_usage.most_common(USAGE_BOOST_TABLES))
+        return result
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Table and column names starting with prefix, ranked by size and usage"""
+        index = self.snapshot.autocomplete
+        if index is None:
+            return []
+        return index.complete(prefix, limit, self.top_table_usage)
+
+    def execute_query(self, query, snapshot: SchemaSnapshot = None,
+                      estimate: QueryCostEstimate = None) -> QueryResult:
+        """Run a query (SQL or PreparedQuery), keeping at most max_result_rows rows"""
+        query = self._prepared(query, snapshot or self.snapshot)
+        cached = self.cached_result(query)
+        if cached:
+            print("⚡ Served from result cache")
+            return self._record_usage(cached, query)
+        
+        if self.use_bigquery:
+            # The dry run both reports the cost and enforces BIGQUERY_MAX_BYTES_BILLED
+            estimate = estimate or self.estimate_query(query)
+            # BigQuery results stay as Arrow until they are serialized
+            table, truncated = self.db_inspector.execute_query_arrow(query.sql, self.max_result_rows, estimate)
+            result = QueryResult(query.sql, truncated=truncated, table=table, estimate=estimate,
+                                 corrections=list(query.corrections))
+            return self._record_usage(self._cache_result(result, query), query)
+        
+        with closing(self.db_inspector.stream_query(query.sql)) as rows:
+            rows, truncated = take_rows(rows, self.max_result_rows)
+        return self._record_usage(self._cache_result(QueryResult(query.sql, rows, truncated), query), query)
+
+    async def execute_query_async(self, query, snapshot: SchemaSnapshot = None,
+                                  estimate: QueryCostEstimate = None) -> QueryResult:
+        """
+        Async variant of execute_query; PostgreSQL runs on the async pool.
+        Concurrent calls for the same read-only query (same result cache key)
+        share one execution; every write runs on its own.
+        """
+        query = self._prepared(query, snapshot or self.snapshot)
+        if not query.read_only:
+            return await self._execute_query_async(query, estimate)
+        return await self.executions.do(query.cache_key, lambda: self._execute_query_async(query, estimate))
+
+    async def _execute_query_async(self, query: PreparedQuery,
+                                   estimate: QueryCostEstimate = None) -> QueryResult:
+        if self.async_db_inspector is None:
+            return await asyncio.to_thread(self.execute_query, query, None, estimate)
+        
+        cached = self.cached_result(query)
+        if cached:
+            print("⚡ Served from result cache")
+            return self._record_usage(cached, query)
+        
+        rows = await self.async_db_inspector.execute_query(query.sql, self.max_result_rows + 1)
+        result = QueryResult(query.sql, rows[:self.max_result_rows], len(rows) > self.max_result_rows)
+        return self._record_usage(self._cache_result(result, query), query)
+
+    async def _result_pages(self, query: str, estimate: QueryCostEstimate,
+                            page_size: int) -> AsyncIterator:
+        """Pages of rows as the database returns them (Arrow record batches for BigQuery)"""
+        if self.async_db_inspector is not None:
+            page = []
+            async with aclosing(self.async_db_inspector.stream_query(query)) as rows:
+                async for row in rows:
+                    page.append(row)
+                    if len(page) == page_size:
+                        yield page
+                        page = []
+            if page:
+                yield page
+            return
+        
+        # BigQuery's client is blocking, so each batch is fetched in a worker thread
+        batches = self.db_inspector.stream_batches(query, estimate)
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    return
+                for offset in range(0, batch.num_rows, page_size):
+                    yield batch.slice(offset, page_size)
+        finally:
+            await asyncio.to_thread(batches.close)
+
+    async def stream_result_pages(self, query, result: QueryResult,
+                                  snapshot: SchemaSnapshot = None,
+                                  estimate: QueryCostEstimate = None,
+                                  page_size: int = None) -> AsyncIterator[List[Dict]]:
+        """
+        Run a query and yield its rows a page at a time as they arrive
+        
+        result is filled in as the query runs (final SQL, corrections, rows,
+        truncation) and is complete once the pages are exhausted; it is then
+        cached like an execute_query result. Stops at max_result_rows.
+        """
+        query = self._prepared(query, snapshot or self.snapshot)
+        page_size = page_size or self.stream_page_size
+        cached = self.cached_result(query)
+        if cached:
+            print("⚡ Served from result cache")
+            for name in ('sql', 'rows', 'truncated', 'table', 'estimate', 'cache_hit', 'corrections'):
+                setattr(result, name, getattr(cached, name))
+            records = result.to_records()
+            for offset in range(0, len(records), page_size):
+                yield records[offset:offset + page_size]
+            self._record_usage(result, query)
+            return
+        
+        if self.use_bigquery:
+            estimate = estimate or await asyncio.to_thread(self.estimate_query, query)
+        result.sql, result.corrections = query.sql, list(query.corrections)
+        result.estimate = estimate
+        result.rows = []
+        batches = []
+        remaining = self.max_result_rows
+        
+        async with aclosing(self._result_pages(result.sql, estimate, page_size)) as pages:
+            async for page in pages:
+                if len(page) > remaining:
+                    result.truncated = True
+                    page = page[:remaining] if isinstance(page, list) else page.slice(0, remaining)
+                remaining -= len(page)
+                if isinstance(page, list):
+                    result.rows.extend(page)
+                else:
+                    batches.append(page)
+                    page = page.to_pylist()
+                if page:
+                    yield page
+                if result.truncated:
+                    break
+        
+        if batches:
+            # Keep BigQuery results columnar in the cache, as execute_query does
+            result.rows = None
+            result.table = pyarrow.Table.from_batches(batches)
+        self._record_usage(self._cache_result(result, query), query)
+
+    def execute_and_explain_query(self, query: str, schema_context: str,
+                                  snapshot: SchemaSnapshot = None) -> tuple:
         print(f"⚡ Executing query: {query[:50]}...")
         try:
-            # Fix SQL for BigQuery if needed
-            if self.use_bigquery and hasattr(self, 'sql_fixer') and self.sql_fixer:
-                original_query = query
-                query = self.sql_fixer.fix_sql(query)
-                if original_query != query:
-                    print(f"🔧 Fixed SQL: {query[:100]}...")
-            
-            results = self.db_inspector.execute_query(query)
-            explanation = self.refiner.explain_query_results(query, results, schema_context)
-            return results, explanation
+            result = self.execute_query(query, snapshot)
+            explanation = self.refiner.explain_query_results(
+                result.sql, result.preview(), schema_context, result.row_count
+            )
+            return result.to_records(), explanation
         except Exception as e:
             return None, f"Error executing query: {e}"
 
-    def interactive_mode(self):
+    async def store_result(self, result: QueryResult, schema_context: str, explain: bool = None) -> Optional[str]:
+        """
+        Keep an executed result so it can be explained later; returns its id,
+        or None if the store is disabled or the result is too large.
+        
+        The SQL and preview needed for the explanation also go to the shared
+        state, so /explain works whichever worker process it reaches. The
+        schema context is not written there; another worker rebuilds it from
+        the tables the SQL names.
+        """
+        stored = self.result_store.add(result, schema_context)
+        if stored is None:
+            return None
+        result_id, entry = stored
+        if self.explain_in_background if explain is None else explain:
+            self._start_explanation(result_id, entry)
+        await asyncio.to_thread(self.shared_state.set, f"result:{result_id}", {
+            "sql": result.sql,
+            "preview": result.preview(),
+            "row_count": result.row_count,
+        }, self.result_store.ttl)
+        return result_id
+
+    def _start_explanation(self, result_id: str, entry: StoredResult) -> asyncio.Future:
+        if entry.explanation is None:
+            result = entry.result
+            entry.explanation = asyncio.ensure_future(self.async_refiner.explain_query_results(
+                result.sql, result.preview(), entry.schema_context, result.row_count
+            ))
+            entry.explanation.add_done_callback(partial(self._explanation_done, result_id))
+        return entry.explanation
+
+    def _explanation_done(self, result_id: str, future: asyncio.Future) -> None:
+        """Share a finished explanation with the other workers; a failure is logged and shared as its error"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        explanation = f"Error explaining results: {error}" if error is not None else future.result()
+        if explanation.startswith("Error explaining results"):
+            print(f"⚠️  Explaining result {result_id} failed: {explanation}")
+        # Written from a worker thread; callers already have the explanation
+        shared = asyncio.get_running_loop().run_in_executor(None, self._share_explanation, result_id, explanation)
+        shared.add_done_callback(partial(self._explanation_shared, result_id))
+
+    @staticmethod
+    def _explanation_shared(result_id: str, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            print(f"⚠️  Could not share the explanation of result {result_id}: {future.exception()}")
+
+    def _share_explanation(self, result_id: str, explanation: str) -> None:
+        self.shared_state.set(f"explanation:{result_id}", explanation, ttl=self.result_store.ttl)
+
+    async def save_explanation(self, result_id: str, explanation: str) -> None:
+        """Attach an explanation produced elsewhere (e.g. streamed) to a stored result"""
+        entry = self.result_store.get(result_id)
+        if entry is not None and entry.explanation is None:
+            entry.explanation = asyncio.get_running_loop().create_future()
+            entry.explanation.set_result(explanation)
+        await asyncio.to_thread(self._share_explanation, result_id, explanation)
+
+    async def explain_result(self, result_id: str) -> Optional[str]:
+        """
+        Explanation of a stored result, started now if it was not already
+        running; every caller shares the same Claude request. None if the
+        result is unknown or has expired; a failure comes back as an
+        "Error explaining results" message, here and in other workers.
+        """
+        entry = self.result_store.get(result_id)
+        if entry is not None:
+            try:
+                # Shielded so a caller that gives up does not cancel it for everyone else
+                return await asyncio.shield(self._start_explanation(result_id, entry))
+            except Exception as e:
+                return f"Error explaining results: {e}"
+        
+        # Stored by another worker process
+        explanation = await asyncio.to_thread(self.shared_state.get, f"explanation:{result_id}")
+        if explanation is not None:
+            return explanation
+        record = await asyncio.to_thread(self.shared_state.get, f"result:{result_id}")
+        if record is None:
+            return None
+        schema_context = self.schema_context_for(record["sql"])
+        explanation = await self.async_refiner.explain_query_results(
+            record["sql"], record["preview"], schema_context, record["row_count"]
+        )
+        await asyncio.to_thread(self._share_explanation, result_id, explanation)
+        return explanation
+
+    def interactive_mode(self, refresh_schema: bool = False):
         print(f"🚀 Welcome to QueryGPT Interactive Mode ({self.db_type})!")
         print("Type 'help' for commands, 'quit' to exit\n")
 
         # Get initial schema analysis
-        schema_summary = self.analyze_schema()
+        schema_summary = None if refresh_schema else self.load_schema_from_catalog()
+        if schema_summary is None:
+            schema_summary = self.analyze_schema()
         print("\n" + "=" * 60)
         print("DATABASE SCHEMA ANALYSIS")
         print("=" * 60)
@@ -138,13 +834,14 @@ Available commands:
                 
                 elif user_input.strip():
                     # Check if it's SQL or natural language
+                    schema_context = self.schema_context_for(user_input)
                     if self.is_sql_query(user_input):
                         # Execute SQL directly
-                        results, explanation = self.execute_and_explain_query(user_input, schema_summary)
+                        results, explanation = self.execute_and_explain_query(user_input, schema_context)
                     else:
                         # Convert natural language to SQL first
                         print("🤖 Converting natural language to SQL...")
-                        sql_query = self.refiner.convert_natural_language_to_sql(user_input, schema_summary)
+                        sql_query = self.refiner.convert_natural_language_to_sql(user_input, schema_context)
                         
                         if sql_query.startswith("Error"):
                             print(f"❌ {sql_query}")
@@ -153,7 +850,7 @@ Available commands:
                         print(f"📝 Generated SQL: {sql_query}")
                         
                         # Execute the generated SQL
-                        results, explanation = self.execute_and_explain_query(sql_query, schema_summary)
+                        results, explanation = self.execute_and_explain_query(sql_query, schema_context)
                     
                     if results is not None:
                         print(f"\n📊 Query returned {len(results)} results")
@@ -188,8 +885,11 @@ def main():
     parser.add_argument("--bigquery", action="store_true", help="Use BigQuery instead of PostgreSQL")
     parser.add_argument("--service-account-path", help="Path to BigQuery service account JSON file")
     parser.add_argument("--bigquery-project-id", help="BigQuery project ID")
+    parser.add_argument("--catalog-path", help="Schema catalog file (defaults to SCHEMA_CATALOG_PATH)")
+    parser.add_argument("--refresh-schema", action="store_true", help="Ignore the schema catalog and re-crawl the database")
     
     args = parser.parse_args()
+    query_gpt = None
     
     try:
         query_gpt = QueryGPT(
@@ -197,12 +897,17 @@ def main():
             anthropic_api_key=args.anthropic_api_key,
             use_bigquery=args.bigquery,
             service_account_path=args.service_account_path,
-            bigquery_project_id=args.bigquery_project_id
+            bigquery_project_id=args.bigquery_project_id,
+            catalog_path=args.catalog_path
         )
         
         if args.query:
             # Single query mode
-            schema_summary = query_gpt.analyze_schema(not args.no_claude)
+            schema_summary = None
+            if not args.refresh_schema:
+                schema_summary = query_gpt.load_schema_from_catalog(not args.no_claude)
+            if schema_summary is None:
+                schema_summary = query_gpt.analyze_schema(not args.no_claude)
             results, explanation = query_gpt.execute_and_explain_query(args.query, schema_summary)
             
             if results is not None:
@@ -214,11 +919,14 @@ def main():
                 print(explanation)
         else:
             # Interactive mode
-            query_gpt.interactive_mode()
+            query_gpt.interactive_mode(args.refresh_schema)
     
     except Exception as e:
         print(f"❌ Error: {e}")
         sys.exit(1)
+    finally:
+        if query_gpt is not None:
+            query_gpt.close()
 
 
 if __name__ == "__main__":
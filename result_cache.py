@@ -0,0 +1,129 @@
+"""
+In-memory cache of query results, keyed by canonical SQL and table freshness
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional, Tuple
+
+# String literals, quoted identifiers and comments, in the order they must be recognised
+_SQL_TOKEN = re.compile(
+    r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`|--[^\n]*|/\*.*?\*/|\s+|[^'"`\s/-]+|[/-])""",
+    re.DOTALL
+)
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical form of a query for cache lookups: comments dropped, whitespace
+    collapsed, a trailing semicolon removed and everything outside string
+    literals and quoted identifiers lower-cased.
+    """
+    parts = []
+    for token in _SQL_TOKEN.findall(sql.strip().rstrip(';')):
+        if token.startswith('--') or token.startswith('/*'):
+            parts.append(' ')
+        elif token[0] in '\'"`':
+            parts.append(token)
+        elif token.isspace():
+            parts.append(' ')
+        else:
+            parts.append(token.lower())
+    return re.sub(r'\s+', ' ', ''.join(parts)).strip().rstrip(';').strip()
+
+
+def referenced_tables(sql: str, tables: Iterable) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """
+    (name, modified) for every known table whose name appears in the query.
+
+    Matching is on the last part of the table name, so it can over-match
+    (which only makes the key stricter) but never misses a referenced table.
+    """
+    identifiers = {word.lower() for word in _IDENTIFIER.findall(sql)}
+    found = []
+    for table in tables:
+        full_name = getattr(table, 'full_name', None) or table.name
+        if full_name.split('.')[-1].lower() in identifiers:
+            found.append((full_name, getattr(table, 'modified', None)))
+    return tuple(sorted(found, key=lambda item: item[0]))
+
+
+def estimate_size(result) -> int:
+    """Approximate memory held by a QueryResult"""
+    if result.table is not None:
+        return result.table.nbytes
+    return len(json.dumps(result.rows or [], default=str))
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a TTL and a total byte budget"""
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None, ttl: float = None):
+        """
+        Args:
+            max_entries: Entry limit (RESULT_CACHE_MAX_ENTRIES, 0 disables the cache)
+            max_bytes: Combined size limit (RESULT_CACHE_MAX_BYTES)
+            ttl: Seconds an entry stays valid (RESULT_CACHE_TTL)
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '256'))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('RESULT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+        self.ttl = ttl if ttl is not None else float(os.getenv('RESULT_CACHE_TTL', '600'))
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key) -> Optional[Any]:
+        """Return the cached value for key, or None if absent or expired"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size: int) -> None:
+        """Store a value, evicting least recently used entries to stay within budget"""
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """Drop every entry whose key (sql, ((table, modified), ...)) references one of the tables"""
+        tables = set(tables)
+        with self._lock:
+            for key in [key for key in self._entries if any(name in tables for name, _ in key[1])]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
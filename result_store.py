@@ -0,0 +1,44 @@
+"""
+Server-side store of executed results, so explanations can follow the rows instead of holding them up
+"""
+import asyncio
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+from result_cache import ResultCache, estimate_size
+
+
+@dataclass
+class StoredResult:
+    result: Any  # QueryResult
+    schema_context: str  # the context the SQL was generated against, reused for the explanation
+    explanation: Optional[asyncio.Future] = None  # set once an explanation has been requested
+
+
+class ResultStore(ResultCache):
+    """Recently executed results by opaque id, with the same LRU/TTL/byte limits as ResultCache"""
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None, ttl: float = None):
+        """
+        Args:
+            max_entries: Results kept (RESULT_STORE_MAX_ENTRIES, 0 disables the store)
+            max_bytes: Combined size limit (RESULT_STORE_MAX_BYTES)
+            ttl: Seconds a result can still be explained (RESULT_STORE_TTL)
+        """
+        super().__init__(
+            max_entries if max_entries is not None else int(os.getenv('RESULT_STORE_MAX_ENTRIES', '1000')),
+            max_bytes if max_bytes is not None else int(os.getenv('RESULT_STORE_MAX_BYTES', str(256 * 1024 * 1024))),
+            ttl if ttl is not None else float(os.getenv('RESULT_STORE_TTL', '900')),
+        )
+
+    def add(self, result, schema_context: str) -> Optional[Tuple[str, StoredResult]]:
+        """Store a result under a new id; returns (id, entry), or None if it cannot be kept"""
+        size = estimate_size(result)
+        if not self.enabled or size > self.max_bytes:
+            return None
+        result_id = uuid.uuid4().hex
+        stored = StoredResult(result, schema_context)
+        self.put(result_id, stored, size)
+        return result_id, stored
@@ -0,0 +1,186 @@
+"""
+Persistent schema catalog so QueryGPT can start without re-crawling the database
+"""
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import asdict, fields
+from typing import List, Optional, Tuple, Type
+
+
+class SchemaCatalog:
+    """SQLite-backed store for table metadata, the schema summary built from it and cached Claude output"""
+
+    def __init__(self, path: str = None):
+        """
+        Open (or create) the catalog file
+
+        Args:
+            path: SQLite file location (defaults to SCHEMA_CATALOG_PATH)
+        """
+        self.path = path or os.getenv('SCHEMA_CATALOG_PATH', '.querygpt_catalog.sqlite')
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tables (
+                    source TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    modified TEXT,
+                    record TEXT NOT NULL,
+                    PRIMARY KEY (source, name)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    source TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    saved_at REAL NOT NULL
+                )
+            """)
+            # The schema last published for each source; generation goes up on every publish
+            # so other processes can tell cheaply when to reload
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    source TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL,
+                    summary TEXT NOT NULL,
+                    published_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    saved_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _table_name(table) -> str:
+        return getattr(table, 'full_name', None) or table.name
+
+    @staticmethod
+    def _from_record(table_class: Type, record: dict):
+        """Rebuild a table dataclass, restoring tuples that JSON turned into lists"""
+        known = {f.name for f in fields(table_class)}
+        values = {}
+        for key, value in record.items():
+            if key not in known:
+                continue
+            if isinstance(value, list):
+                value = [tuple(item) if isinstance(item, list) else item for item in value]
+            values[key] = value
+        return table_class(**values)
+
+    def _table_rows(self, source: str, tables: List) -> List[tuple]:
+        return [
+            (source, self._table_name(table), getattr(table, 'modified', None),
+             json.dumps(asdict(table), default=str))
+            for table in tables
+        ]
+
+    @staticmethod
+    def _replace_tables(conn: sqlite3.Connection, source: str, rows: List[tuple]) -> None:
+        conn.execute("DELETE FROM tables WHERE source = ?", (source,))
+        conn.executemany(
+            "INSERT INTO tables (source, name, modified, record) VALUES (?, ?, ?, ?)",
+            rows
+        )
+
+    def save_tables(self, source: str, tables: List) -> None:
+        """Replace every stored table for a source with the given list"""
+        rows = self._table_rows(source, tables)
+        with closing(self._connect()) as conn, conn:
+            self._replace_tables(conn, source, rows)
+
+    def publish(self, source: str, tables: List, summary: str) -> int:
+        """
+        Replace the tables and published summary of a source in one transaction,
+        so readers never see tables from one schema with the summary of another.
+        Returns the new generation.
+        """
+        rows = self._table_rows(source, tables)
+        with closing(self._connect()) as conn, conn:
+            self._replace_tables(conn, source, rows)
+            row = conn.execute("SELECT generation FROM snapshots WHERE source = ?", (source,)).fetchone()
+            generation = (row[0] if row else 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (source, generation, summary, published_at) VALUES (?, ?, ?, ?)",
+                (source, generation, summary, time.time())
+            )
+        return generation
+
+    def generation(self, source: str) -> int:
+        """Generation of the published schema for a source (0 if nothing was published)"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT generation FROM snapshots WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else 0
+
+    def load_published(self, source: str, table_class: Type) -> Optional[Tuple[int, List, str]]:
+        """(generation, tables, summary) of the published schema for a source, read consistently"""
+        with closing(self._connect()) as conn:
+            # One read transaction, so a concurrent publish is seen entirely or not at all
+            conn.execute("BEGIN")
+            row = conn.execute(
+                "SELECT generation, summary FROM snapshots WHERE source = ?",
+                (source,)
+            ).fetchone()
+            records = conn.execute(
+                "SELECT record FROM tables WHERE source = ? ORDER BY rowid",
+                (source,)
+            ).fetchall()
+            conn.execute("COMMIT")
+        if row is None or not records:
+            return None
+        tables = [self._from_record(table_class, json.loads(record[0])) for record in records]
+        return row[0], tables, row[1]
+
+    def load_tables(self, source: str, table_class: Type) -> List:
+        """Load stored tables for a source as instances of table_class"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT record FROM tables WHERE source = ? ORDER BY rowid",
+                (source,)
+            ).fetchall()
+        return [self._from_record(table_class, json.loads(row[0])) for row in rows]
+
+    def save_summary(self, source: str, summary: str) -> None:
+        """Store the (Claude-refined) schema summary for a source"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (source, summary, saved_at) VALUES (?, ?, ?)",
+                (source, summary, time.time())
+            )
+
+    def load_summary(self, source: str) -> Optional[str]:
+        """Return the stored schema summary for a source, if any"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT summary FROM summaries WHERE source = ?",
+                (source,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_artifact(self, key: str, kind: str, content: str) -> None:
+        """Store generated text under a content hash of whatever produced it"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (key, kind, content, saved_at) VALUES (?, ?, ?, ?)",
+                (key, kind, content, time.time())
+            )
+
+    def load_artifact(self, key: str) -> Optional[str]:
+        """Return generated text stored under a content hash, if any"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT content FROM artifacts WHERE key = ?",
+                (key,)
+            ).fetchone()
+        return row[0] if row else None
@@ -1,3 +1,4 @@
+import re
 from typing import List
 from database_inspector import TableInfo
 
@@ -43,6 +44,21 @@ class SchemaSummarizer:
             readable_type = SchemaSummarizer.format_data_type(data_type)
             summary += f"  - {column_name}: {readable_type}\n"
         
+        if table.primary_key:
+            summary += f"  Primary key: {', '.join(table.primary_key)}\n"
+        
+        for column_name, ref_table, ref_column in table.foreign_keys:
+            summary += f"  Foreign key: {column_name} -> {ref_table}.{ref_column}\n"
+        
+        # Only list secondary indexes; the primary key index is implied
+        indexed = []
+        for definition in table.indexes:
+            match = re.search(r'INDEX (\S+) ON .*\((.*)\)', definition)
+            if match and not match.group(1).endswith('_pkey'):
+                indexed.append(match.group(2))
+        if indexed:
+            summary += f"  Indexed: {', '.join(indexed)}\n"
+        
         return summary
     
     @staticmethod
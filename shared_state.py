@@ -0,0 +1,140 @@
+"""
+State shared by every API worker process on a host: a small SQLite key/value store and file locks
+"""
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+class FileLock:
+    """
+    Advisory lock on a file (flock), held until release() or process exit,
+    so a crashed holder never leaves it locked
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock; without blocking, return False if another process has it"""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SharedState:
+    """
+    JSON values with optional expiry in a SQLite file (a local stand-in for
+    Redis), visible to every worker process that opens the same path. Each
+    thread keeps its own connection. Calls block on disk I/O, so async code
+    runs them in a thread.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: SQLite file location (defaults to SHARED_STATE_PATH)
+        """
+        self.path = path or os.getenv('SHARED_STATE_PATH', '.querygpt_state.sqlite')
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS state_expiry ON state (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection (used as a context manager, it wraps one transaction)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Losing the last few writes in a power cut is fine for this data; an fsync per write is not
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def set(self, key: str, value: Any, ttl: float = None) -> None:
+        """Store a JSON-serializable value, expiring after ttl seconds if given"""
+        expires_at = time.time() + ttl if ttl else None
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), expires_at)
+            )
+
+    def get(self, key: str, ttl: float = None) -> Optional[Any]:
+        """
+        Return the value for key, or None if absent or expired. With ttl the
+        expiry slides: a read keeps the entry for another ttl seconds. To keep
+        reads from writing every time, the expiry is only pushed out once
+        less than half of the ttl is left.
+        """
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            if row and ttl and row[1] is not None and row[1] - now < ttl / 2:
+                conn.execute("UPDATE state SET expires_at = ? WHERE key = ?", (now + ttl, key))
+        return json.loads(row[0]) if row else None
+
+    def delete(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def trim(self, prefix: str, max_entries: int) -> int:
+        """
+        Keep only the max_entries keys under prefix that expire last. For
+        entries written and read with the same sliding ttl that is LRU order
+        (to within half the ttl). Returns how many were removed.
+        """
+        with self._connection() as conn:
+            return conn.execute("""
+                DELETE FROM state WHERE key IN (
+                    SELECT key FROM state WHERE key >= ? AND key < ?
+                    ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (prefix, prefix + '\uffff', max_entries)).rowcount
+
+    def purge_expired(self) -> int:
+        """Drop expired entries; returns how many were removed"""
+        with self._connection() as conn:
+            return conn.execute(
+                "DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),)
+            ).rowcount
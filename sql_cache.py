@@ -0,0 +1,250 @@
+"""
+Cache of generated SQL so repeated questions skip the Claude round trip
+"""
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from bigquery_sql_fixer import edit_distance
+
+# Character n-grams are hashed into this many buckets
+VECTOR_DIMS = 4096
+NGRAM_SIZE = 3
+
+# Words that change the phrasing of a question but not what it asks for
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'for', 'in', 'on', 'by', 'per', 'to', 'from', 'with',
+    'and', 'or', 'is', 'are', 'was', 'were', 'be', 'me', 'my', 'i', 'we', 'our',
+    'show', 'list', 'give', 'get', 'find', 'tell', 'display', 'what', 'which',
+    'how', 'many', 'much', 'please', 'can', 'you', 'all', 'each', 'every', 's',
+}
+
+# Prefixes that negate a word ("paid"/"unpaid"), so word and prefix + word never match
+NEGATING_PREFIXES = ('un', 'in', 'non', 'dis')
+
+# Words that are spelled alike but ask for opposite things
+ANTONYMS = {frozenset(pair) for pair in [
+    ('ascending', 'descending'), ('asc', 'desc'), ('min', 'max'), ('minimum', 'maximum'),
+    ('highest', 'lowest'), ('largest', 'smallest'), ('biggest', 'smallest'), ('most', 'least'),
+    ('first', 'last'), ('earliest', 'latest'), ('oldest', 'newest'), ('before', 'after'),
+    ('above', 'below'), ('over', 'under'), ('more', 'less'), ('top', 'bottom'),
+    ('increase', 'decrease'), ('increasing', 'decreasing'), ('increased', 'decreased'),
+    ('import', 'export'), ('imports', 'exports'), ('inbound', 'outbound'), ('input', 'output'),
+    ('include', 'exclude'), ('including', 'excluding'), ('debit', 'credit'), ('debits', 'credits'),
+    ('buy', 'sell'), ('open', 'closed'), ('success', 'failure'), ('successful', 'failed'),
+    ('enabled', 'disabled'), ('active', 'inactive'), ('paid', 'unpaid'),
+]}
+
+
+# Comparison operators, signed and decimal numbers, and words in any script;
+# other punctuation is dropped
+_QUESTION_TOKEN = re.compile(r'!=|[<>=]+|-?\d+(?:\.\d+)?|\w+|-')
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case a question and strip punctuation (but not operators or signs) and extra whitespace"""
+    return ' '.join(_QUESTION_TOKEN.findall(question.lower()))
+
+
+def _is_number(word: str) -> bool:
+    return _NUMBER.fullmatch(word) is not None
+
+
+def _vectorize(question: str) -> np.ndarray:
+    """Sublinear term frequencies of hashed character n-grams of the content words"""
+    vector = np.zeros(VECTOR_DIMS, dtype=np.float32)
+    words = [w for w in question.split() if w not in STOPWORDS] or question.split()
+    padded = f" {' '.join(words)} "
+    for i in range(len(padded) - NGRAM_SIZE + 1):
+        vector[zlib.crc32(padded[i:i + NGRAM_SIZE].encode()) % VECTOR_DIMS] += 1
+    np.log1p(vector, out=vector)
+    return vector
+
+
+def _same_word(word: str, other: str) -> bool:
+    """
+    Whether two words mean the same: equal, a plural of one another, or a
+    one-edit typo of a word of at least 5 letters. Negated forms ("paid" and
+    "unpaid") and antonyms ("ascending" and "descending") never match.
+    """
+    if word == other:
+        return True
+    if frozenset((word, other)) in ANTONYMS:
+        return False
+    short, long = sorted((word, other), key=len)
+    if any(long == prefix + short for prefix in NEGATING_PREFIXES):
+        return False
+    if long in (short + 's', short + 'es') or (short.endswith('y') and long == short[:-1] + 'ies'):
+        return True
+    return len(short) >= 5 and edit_distance(word, other, 1) <= 1
+
+
+def _same_intent(question: str, candidate: str) -> bool:
+    """
+    Guard against questions that look alike but ask different things
+    ("cost by region" vs "cost by provider", "top 5" vs "top 10"): numbers
+    must match exactly and every content word or operator must have a
+    counterpart in the other question that _same_word accepts.
+    """
+    words, other = question.split(), candidate.split()
+    if [w for w in words if _is_number(w)] != [w for w in other if _is_number(w)]:
+        return False
+
+    def covered(source: List[str], target: List[str]) -> bool:
+        target = [w for w in target if w not in STOPWORDS]
+        return all(
+            any(_same_word(w, t) for t in target)
+            for w in source if w not in STOPWORDS and not _is_number(w)
+        )
+
+    return covered(words, other) and covered(other, words)
+
+
+@dataclass
+class SQLCacheHit:
+    sql: str
+    question: str  # the cached question that matched
+    similarity: float  # 1.0 for exact matches
+    exact: bool = False
+
+
+class _QuestionIndex:
+    """
+    TF-IDF vectors for the cached questions of one schema. Row i of the
+    matrices belongs to questions[i]; the matrices are preallocated and
+    doubled when full, and a removed row is filled with the last one, so
+    adding and removing never copy the whole matrix.
+    """
+
+    def __init__(self):
+        self.questions: List[str] = []
+        self.rows = {}  # question -> row
+        self.vectors = np.zeros((0, VECTOR_DIMS), dtype=np.float32)
+        self.squared = np.zeros((0, VECTOR_DIMS), dtype=np.float32)  # vectors ** 2, for norms
+        self.document_freq = np.zeros(VECTOR_DIMS, dtype=np.float32)
+
+    def _grow(self) -> None:
+        capacity = max(1, 2 * len(self.vectors))
+        for name in ('vectors', 'squared'):
+            grown = np.zeros((capacity, VECTOR_DIMS), dtype=np.float32)
+            grown[:len(self.questions)] = getattr(self, name)[:len(self.questions)]
+            setattr(self, name, grown)
+
+    def add(self, question: str) -> None:
+        vector = _vectorize(question)
+        row = len(self.questions)
+        if row == len(self.vectors):
+            self._grow()
+        self.vectors[row] = vector
+        self.squared[row] = vector ** 2
+        self.rows[question] = row
+        self.questions.append(question)
+        self.document_freq += vector > 0
+
+    def remove(self, question: str) -> None:
+        row = self.rows.pop(question)
+        self.document_freq -= self.vectors[row] > 0
+        last = len(self.questions) - 1
+        if row != last:
+            moved = self.questions[last]
+            self.questions[row] = moved
+            self.rows[moved] = row
+            self.vectors[row] = self.vectors[last]
+            self.squared[row] = self.squared[last]
+        self.questions.pop()
+
+    def search(self, question: str) -> Optional[Tuple[str, float]]:
+        """Most similar cached question by cosine similarity of TF-IDF vectors"""
+        count = len(self.questions)
+        if not count:
+            return None
+        query = _vectorize(question)
+        idf = np.log((2 + count) / (1 + self.document_freq + (query > 0))) + 1
+        weights = idf ** 2
+        # Cosine similarity of the idf-weighted vectors without materializing the weighted matrix
+        dots = self.vectors[:count] @ (query * weights)
+        norms = np.sqrt(self.squared[:count] @ weights) * np.sqrt((query ** 2) @ weights)
+        scores = dots / np.where(norms == 0, 1, norms)
+        best = int(np.argmax(scores))
+        return self.questions[best], float(scores[best])
+
+
+class SQLCache:
+    """
+    Two-tier cache of generated SQL.
+
+    The exact tier matches the normalized question under the same schema
+    context. The fuzzy tier finds the most similar cached question for that
+    schema with char n-gram TF-IDF and accepts it above a similarity threshold.
+    """
+
+    def __init__(self, max_entries: int = None, similarity: float = None):
+        """
+        Args:
+            max_entries: Questions kept across all schemas (SQL_CACHE_MAX_ENTRIES, 0 disables the cache)
+            similarity: Minimum cosine similarity for the fuzzy tier (SQL_CACHE_SIMILARITY, above 1 disables it)
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('SQL_CACHE_MAX_ENTRIES', '1000'))
+        self.similarity = similarity if similarity is not None else float(os.getenv('SQL_CACHE_SIMILARITY', '0.85'))
+        self._entries = OrderedDict()  # (schema_hash, question) -> sql
+        self._indexes = {}  # schema_hash -> _QuestionIndex
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def schema_hash(schema_context: str) -> str:
+        return hashlib.sha256(schema_context.encode()).hexdigest()
+
+    def get(self, question: str, schema_context: str) -> Optional[SQLCacheHit]:
+        """Return cached SQL for this question (or a near-identical one), if any"""
+        if self.max_entries <= 0:
+            return None
+        schema = self.schema_hash(schema_context)
+        question = normalize_question(question)
+        with self._lock:
+            sql = self._entries.get((schema, question))
+            if sql is not None:
+                self._entries.move_to_end((schema, question))
+                return SQLCacheHit(sql, question, 1.0, exact=True)
+
+            if self.similarity > 1 or schema not in self._indexes:
+                return None
+            match = self._indexes[schema].search(question)
+            if match is None:
+                return None
+            candidate, score = match
+            if score < self.similarity or not _same_intent(question, candidate):
+                return None
+            self._entries.move_to_end((schema, candidate))
+            return SQLCacheHit(self._entries[(schema, candidate)], candidate, min(score, 1.0))
+
+    def put(self, question: str, schema_context: str, sql: str) -> None:
+        """Remember the SQL generated for a question under a schema context"""
+        if self.max_entries <= 0:
+            return
+        key = (self.schema_hash(schema_context), normalize_question(question))
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = sql
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = sql
+            self._indexes.setdefault(key[0], _QuestionIndex()).add(key[1])
+            while len(self._entries) > self.max_entries:
+                schema, old_question = self._entries.popitem(last=False)[0]
+                index = self._indexes[schema]
+                index.remove(old_question)
+                if not index.questions:
+                    del self._indexes[schema]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
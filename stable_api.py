@@ -88,7 +88,7 @@ async def initialize_query_gpt():
             
             # Initialize schema in background to avoid timeout
             logger.info("📊 Loading schema (this may take a moment)...")
-            query_gpt.schema_summary = query_gpt.analyze_schema()
+            await asyncio.to_thread(query_gpt.analyze_schema)
             
             is_initialized = True
             logger.info("✅ QueryGPT API ready!")
@@ -115,6 +115,19 @@ async def health_check():
         "initialized": is_initialized
     }
 
+async def execute_and_explain(sql_query: str, schema_context: str) -> tuple:
+    """Run a query and explain it, returning (QueryResult, explanation) or (None, error)"""
+    logger.info(f"⚡ Executing query: {sql_query[:50]}...")
+    try:
+        prepared = await asyncio.to_thread(query_gpt.prepare_query, sql_query)
+        result = await query_gpt.execute_query_async(prepared)
+        explanation = await query_gpt.async_refiner.explain_query_results(
+            result.sql, result.preview(), schema_context, result.row_count
+        )
+        return result, explanation
+    except Exception as e:
+        return None, f"Error executing query: {e}"
+
 @app.post("/query", response_model=QueryResponse)
 async def process_query(request: QueryRequest):
     try:
@@ -137,9 +150,8 @@ async def process_query(request: QueryRequest):
             else:
                 # Convert natural language to SQL with timeout
                 sql_query = await asyncio.wait_for(
-                    asyncio.to_thread(
-                        query_gpt.refiner.convert_natural_language_to_sql,
-                        question, 
+                    query_gpt.async_refiner.convert_natural_language_to_sql(
+                        question,
                         query_gpt.schema_summary
                     ),
                     timeout=30.0  # 30 second timeout
@@ -155,19 +167,15 @@ async def process_query(request: QueryRequest):
                     )
             
             # Execute the query with timeout
-            results, explanation = await asyncio.wait_for(
-                asyncio.to_thread(
-                    query_gpt.execute_and_explain_query,
-                    sql_query,
-                    query_gpt.schema_summary
-                ),
+            result, explanation = await asyncio.wait_for(
+                execute_and_explain(sql_query, query_gpt.schema_summary),
                 timeout=60.0  # 60 second timeout
             )
             
-            if results is not None:
+            if result is not None:
                 return QueryResponse(
                     sql_query=sql_query,
-                    results=results,
+                    results=result.to_records(),
                     explanation=explanation,
                     success=True
                 )
@@ -0,0 +1,37 @@
+"""
+Table suggestions from /suggest-tables, kept per client session
+"""
+import os
+from typing import List, Optional
+
+from shared_state import SharedState
+
+
+class SuggestionStore:
+    """
+    The tables last suggested to each session, so a follow-up can pick one by
+    number. Only table names are stored, in the shared state, so any worker
+    can resolve them against its own schema snapshot. Sessions expire after
+    TABLE_SUGGESTIONS_TTL seconds without use and the least recently used are
+    dropped beyond TABLE_SUGGESTIONS_MAX_SESSIONS.
+    """
+
+    PREFIX = "table_suggestions:"
+
+    def __init__(self, state: SharedState, max_sessions: int = None, ttl: float = None):
+        self.state = state
+        self.max_sessions = max_sessions if max_sessions is not None else int(os.getenv('TABLE_SUGGESTIONS_MAX_SESSIONS', '10000'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('TABLE_SUGGESTIONS_TTL', '1800'))
+
+    def save(self, session_id: str, table_names: List[str]) -> None:
+        """Replace the suggestions of a session"""
+        self.state.set(self.PREFIX + session_id, table_names, self.ttl)
+        self.state.trim(self.PREFIX, self.max_sessions)
+
+    def get(self, session_id: str) -> Optional[List[str]]:
+        return self.state.get(self.PREFIX + session_id, self.ttl)
+
+    def resolve(self, session_id: str, option: int) -> Optional[str]:
+        """Name of the table behind suggestion number option (1-based), if there is one"""
+        names = self.get(session_id) or []
+        return names[option - 1] if 0 < option <= len(names) else None
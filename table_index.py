@@ -0,0 +1,116 @@
+"""
+In-memory BM25 index over table metadata, used to pick the tables relevant to a question
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# Words that carry no signal about which table a question needs
+STOP_WORDS = {
+    'show', 'me', 'the', 'what', 'how', 'many', 'much', 'by', 'for', 'in', 'of', 'a', 'an',
+    'is', 'are', 'was', 'were', 'from', 'to', 'with', 'and', 'or', 'on', 'per', 'all',
+    'each', 'list', 'give', 'get', 'find', 'which', 'who', 'where', 'when', 'top', 'select',
+    'table', 'tables', 'data', 'please', 'can', 'you', 'i', 'my', 'our', 'we',
+}
+
+# Field weights: a match in a table's own name says more than a match in a column or description
+TABLE_NAME_WEIGHT = 3
+COLUMN_WEIGHT = 1
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split identifiers and prose into lower-case terms: camelCase, snake_case,
+    dotted names and digits are all broken apart, and a trailing plural "s" is
+    dropped so "customers" matches a "customer" column.
+    """
+    text = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', text or '')
+    text = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1 \2', text)
+    terms = []
+    for word in re.findall(r'[a-z]+|[0-9]+', text.lower()):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def table_fields(table) -> Dict[str, str]:
+    """The searchable text of a BigQuery or PostgreSQL table, by field"""
+    name = getattr(table, 'full_name', None) or table.name
+    columns = ' '.join(column[0] for column in table.columns)
+    return {
+        'name': name,
+        'columns': columns,
+        'description': getattr(table, 'description', None) or '',
+    }
+
+
+class TableSearchIndex:
+    """
+    Inverted index of table name, column and description terms, ranked with
+    BM25. Built once per schema snapshot, so a search touches only the
+    postings of the query terms rather than every table.
+    """
+
+    def __init__(self, tables: Iterable, k1: float = 1.2, b: float = 0.75):
+        self.tables = list(tables)
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        self.doc_lengths: List[float] = []
+        self.doc_terms: List[frozenset] = []
+
+        for doc_id, table in enumerate(self.tables):
+            fields = table_fields(table)
+            terms = Counter()
+            for term in tokenize(fields['name']):
+                terms[term] += TABLE_NAME_WEIGHT
+            for term in tokenize(fields['columns']):
+                terms[term] += COLUMN_WEIGHT
+            for term in tokenize(fields['description']):
+                terms[term] += DESCRIPTION_WEIGHT
+            for term, freq in terms.items():
+                self.postings[term].append((doc_id, freq))
+            self.doc_lengths.append(sum(terms.values()))
+            self.doc_terms.append(frozenset(terms))
+
+        self.postings = dict(self.postings)
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        count = len(self.tables)
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def query_terms(self, query: str) -> List[str]:
+        """Terms of a question that are worth looking up"""
+        return [term for term in tokenize(query) if term not in STOP_WORDS and len(term) > 1]
+
+    def score_terms(self, terms: Iterable[str], weights: Dict[str, float] = None) -> Dict[int, float]:
+        """BM25 score per table id for the given query terms (optionally weighted per term)"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(terms):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term] * (weights.get(term, 1.0) if weights else 1.0)
+            for doc_id, freq in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+    def matched_terms(self, doc_id: int, terms: Iterable[str]) -> List[str]:
+        """Which of the given terms occur in a table's indexed text"""
+        return [term for term in terms if term in self.doc_terms[doc_id]]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[object, float]]:
+        """Best matching tables for a question, as (table, score) pairs"""
+        scores = self.score_terms(self.query_terms(query))
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self.tables[doc_id], score) for doc_id, score in ranked]
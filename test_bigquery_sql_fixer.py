@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Unit tests for BigQuerySQLFixer's table and column corrections (no BigQuery needed)"""
+
+from bigquery_sql_fixer import BigQuerySQLFixer
+
+TABLES = ["proj.sales.orders", "proj.sales.customers", "proj.ops.servers"]
+COLUMNS = {
+    "proj.sales.orders": ["order_id", "customer_id", "amount", "status", "labels", "labels.key", "labels.value"],
+    "proj.sales.customers": ["customer_id", "name", "region"],
+    "proj.ops.servers": ["hostname", "cpu_count"],
+}
+
+
+def fix(sql):
+    return BigQuerySQLFixer(TABLES, COLUMNS).fix_sql_with_report(sql)
+
+
+def test_misspelled_column_is_corrected():
+    sql, corrections = fix("SELECT SUM(amout) AS total FROM sales.orders")
+    assert "SUM(amount)" in sql
+    assert corrections == [{"kind": "column", "original": "amout", "corrected": "amount"}]
+
+
+def test_misspelled_table_is_corrected():
+    sql, corrections = fix("SELECT name FROM sales.custmers")
+    assert "`proj.sales.customers`" in sql
+    assert corrections[0]["kind"] == "table"
+
+
+def test_implicit_select_alias_is_kept():
+    sql, corrections = fix("SELECT SUM(amount) amountt FROM sales.orders")
+    assert "amountt" in sql
+    assert corrections == []
+
+
+def test_implicit_alias_of_qualified_column_is_kept():
+    sql, corrections = fix("SELECT o.status statuss, o.amount FROM sales.orders o")
+    assert "statuss" in sql
+    assert corrections == []
+
+
+def test_unnest_alias_is_kept():
+    query = (
+        "SELECT label.key, COUNT(*) AS n FROM sales.orders "
+        "CROSS JOIN UNNEST(labels) label GROUP BY label.key"
+    )
+    sql, corrections = fix(query)
+    assert "UNNEST(labels) label GROUP BY label.key" in sql
+    assert corrections == []
+
+
+def test_unnest_as_alias_is_kept():
+    sql, corrections = fix("SELECT l.value FROM sales.orders, UNNEST(labels) AS l")
+    assert "SELECT l.value" in sql
+    assert corrections == []
+
+
+def test_from_inside_string_literal_is_not_a_table():
+    sql, corrections = fix("SELECT order_id FROM sales.orders WHERE status = 'from customers'")
+    assert "'from customers'" in sql
+    assert corrections == []
+
+
+def test_from_inside_comment_is_not_a_table():
+    sql, _ = fix("SELECT order_id -- copied from custmers\nFROM sales.orders")
+    assert "-- copied from custmers" in sql
+
+
+def test_string_literal_is_not_a_column():
+    sql, corrections = fix("SELECT order_id FROM sales.orders WHERE status = 'amout'")
+    assert "'amout'" in sql
+    assert corrections == []
+
+
+def test_preamble_prose_is_dropped():
+    sql, _ = fix("Here is the query without filters:\nSELECT order_id FROM sales.orders")
+    assert sql == "SELECT order_id FROM sales.orders"
+
+
+def test_with_query_after_prose_keeps_its_with():
+    sql, _ = fix("Selecting the totals first:\nWITH t AS (SELECT amount FROM sales.orders) SELECT SUM(amount) FROM t")
+    assert sql.startswith("WITH t AS (SELECT amount FROM sales.orders)")
+
+
+def test_answer_without_sql_is_rejected():
+    sql, _ = fix("I could not write a query without more details")
+    assert "Invalid SQL query provided" in sql
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Unit tests for ClaudeRefiner's generated-SQL reuse (no Claude needed)"""
+
+from claude_refiner import RETRIEVED_TABLES_HEADER, ClaudeRefiner
+from sql_cache import SQLCache
+
+OVERVIEW = "PostgreSQL database with 40 tables; the largest are:\n- orders (1,000 rows)"
+
+
+def retrieved_context(*tables):
+    return OVERVIEW + RETRIEVED_TABLES_HEADER + "\n".join(f"Table: {table}" for table in tables)
+
+
+def recording_refiner():
+    refiner = ClaudeRefiner("test-key", sql_cache=SQLCache(max_entries=100, similarity=0.7))
+    refiner.prompts = []
+
+    def complete(prompt, max_tokens, schema_context=None):
+        refiner.prompts.append(prompt)
+        return "SELECT count(*) FROM orders"
+
+    refiner._complete = complete
+    return refiner
+
+
+def test_sql_is_reused_when_retrieval_returns_other_tables():
+    refiner = recording_refiner()
+    refiner.convert_natural_language_to_sql("how many orders are there", retrieved_context("orders", "customers"))
+    sql = refiner.convert_natural_language_to_sql("how many orders are there?", retrieved_context("orders", "refunds"))
+    assert sql == "SELECT count(*) FROM orders"
+    assert len(refiner.prompts) == 1
+
+
+def test_typo_is_reused_across_retrieved_contexts():
+    refiner = recording_refiner()
+    refiner.convert_natural_language_to_sql("count orders by customer region", retrieved_context("orders"))
+    refiner.convert_natural_language_to_sql("count orders by customer regoin", retrieved_context("orders", "regions"))
+    assert len(refiner.prompts) == 1
+
+
+def test_sql_is_not_reused_across_schemas():
+    refiner = recording_refiner()
+    refiner.convert_natural_language_to_sql("how many orders are there", retrieved_context("orders"))
+    refiner.convert_natural_language_to_sql("how many orders are there", "Table: orders (id, total)")
+    assert len(refiner.prompts) == 2
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Unit tests for QueryGPT's result caching, shared executions, schema refreshes and explanations (no database or Claude needed)"""
+
+import asyncio
+
+import pytest
+
+import query_gpt
+from bigquery_inspector import BigQueryTableInfo
+from database_inspector import TableInfo
+
+
+class RecordingInspector:
+    """Stands in for DatabaseInspector, returning one row per statement it runs"""
+
+    def __init__(self, connection_string: str = None):
+        self.statements = []
+
+    def stream_query(self, query: str):
+        self.statements.append(query)
+        yield {"id": len(self.statements)}
+
+    def close(self):
+        pass
+
+
+class AsyncRecordingInspector:
+    """Stands in for AsyncDatabaseInspector; each statement takes a moment, so concurrent calls overlap"""
+
+    def __init__(self, connection_string: str = None):
+        self.statements = []
+
+    async def execute_query(self, query: str, max_rows: int = None):
+        self.statements.append(query)
+        await asyncio.sleep(0.01)
+        return [{"id": len(self.statements)}]
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def gpt(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(query_gpt, "DatabaseInspector", RecordingInspector)
+    monkeypatch.setattr(query_gpt, "AsyncDatabaseInspector", AsyncRecordingInspector)
+    gpt = query_gpt.QueryGPT("postgresql://unused", "test-key", catalog_path=str(tmp_path / "catalog.sqlite"))
+    gpt._publish_snapshot([TableInfo("accounts", [("id", "integer"), ("bal", "integer")])], "")
+    return gpt
+
+
+def test_repeated_read_is_served_from_cache(gpt):
+    first = gpt.execute_query("SELECT * FROM accounts")
+    second = gpt.execute_query("select *  from accounts;")
+    assert len(gpt.db_inspector.statements) == 1
+    assert not first.cache_hit and second.cache_hit
+
+
+def test_repeated_write_executes_every_time(gpt):
+    insert = "INSERT INTO accounts (bal) VALUES (10) RETURNING id"
+    first = gpt.execute_query(insert)
+    second = gpt.execute_query(insert)
+    assert gpt.db_inspector.statements == [insert, insert]
+    assert not second.cache_hit
+    assert first.rows != second.rows
+
+
+def test_write_invalidates_cached_reads_of_its_table(gpt):
+    gpt.execute_query("SELECT * FROM accounts")
+    gpt.execute_query("UPDATE accounts SET bal = bal - 10")
+    again = gpt.execute_query("SELECT * FROM accounts")
+    assert not again.cache_hit
+    assert len(gpt.db_inspector.statements) == 3
+
+
+def test_data_modifying_with_is_not_cached(gpt):
+    query = "WITH moved AS (DELETE FROM accounts RETURNING *) SELECT count(*) FROM moved"
+    gpt.execute_query(query)
+    assert not gpt.execute_query(query).cache_hit
+    assert len(gpt.db_inspector.statements) == 2
+
+
+def run_concurrently(gpt, query, times=3):
+    async def run():
+        return await asyncio.gather(*(gpt.execute_query_async(query) for _ in range(times)))
+    return asyncio.run(run())
+
+
+def test_concurrent_reads_share_one_execution(gpt):
+    run_concurrently(gpt, "SELECT * FROM accounts")
+    assert len(gpt.async_db_inspector.statements) == 1
+
+
+def test_concurrent_writes_each_execute(gpt):
+    update = "UPDATE accounts SET bal = bal - 10"
+    run_concurrently(gpt, update)
+    assert gpt.async_db_inspector.statements == [update] * 3
+
+
+def test_cli_use_opens_no_shared_state_or_async_pool(gpt, tmp_path):
+    gpt.execute_query("SELECT * FROM accounts")
+    assert not (tmp_path / ".querygpt_state.sqlite").exists()
+    assert "async_db_inspector" not in gpt.__dict__
+
+
+def bigquery_table(name, columns=("id",), row_count=100, modified="2026-01-01T00:00:00"):
+    return BigQueryTableInfo(f"proj.sales.{name}", "sales", name, None, row_count,
+                             [(column, "INT64") for column in columns], "TABLE", None, modified, None)
+
+
+class FakeBigQueryInspector:
+    """Stands in for LimitedBigQueryInspector over a dict of tables the test edits"""
+
+    def __init__(self, service_account_path=None, project_id=None):
+        self.project_id = "proj"
+        self.tables = {}
+        self.crawl_errors = {}
+
+    def get_all_tables_info(self):
+        return list(self.tables.values())
+
+    def get_table_modified_times(self):
+        return {table.full_name: table.modified for table in self.tables.values()}
+
+    def get_tables_info(self, full_names):
+        return [table for table in self.tables.values() if table.full_name in full_names]
+
+
+@pytest.fixture
+def bigquery_gpt(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(query_gpt, "LimitedBigQueryInspector", FakeBigQueryInspector)
+    gpt = query_gpt.QueryGPT(None, "test-key", use_bigquery=True, catalog_path=str(tmp_path / "catalog.sqlite"))
+    gpt.refinements = []
+    gpt.refiner.refine_schema_summary = lambda summary: gpt.refinements.append(summary) or "refined"
+    gpt.db_inspector.tables["orders"] = bigquery_table("orders")
+    gpt.analyze_schema()
+    return gpt
+
+
+def test_data_changes_do_not_trigger_a_refinement(bigquery_gpt):
+    inspector = bigquery_gpt.db_inspector
+    inspector.tables["orders"] = bigquery_table("orders", row_count=250, modified="2026-01-02T00:00:00")
+    changes = bigquery_gpt.refresh_schema()
+    assert changes["modified"] == []
+    assert len(bigquery_gpt.refinements) == 1
+    assert bigquery_gpt.tables[0].row_count == 250
+    # The new timestamp was stored, so the next refresh has nothing to re-fetch
+    assert bigquery_gpt.refresh_schema()["version"] == changes["version"]
+
+
+def test_schema_changes_trigger_a_refinement(bigquery_gpt):
+    bigquery_gpt.db_inspector.tables["orders"] = bigquery_table("orders", ("id", "total"), modified="2026-01-02T00:00:00")
+    assert bigquery_gpt.refresh_schema()["modified"] == ["proj.sales.orders"]
+    assert len(bigquery_gpt.refinements) == 2
+
+
+def test_failed_background_explanation_is_reported(gpt):
+    async def fail(*args):
+        raise RuntimeError("overloaded")
+    gpt.async_refiner.explain_query_results = fail
+
+    async def run():
+        result = gpt.execute_query("SELECT * FROM accounts")
+        result_id = await gpt.store_result(result, "Table: accounts", explain=True)
+        explanation = await gpt.explain_result(result_id)
+        await asyncio.sleep(0.1)  # let the error reach the shared state
+        return result_id, explanation
+
+    result_id, explanation = asyncio.run(run())
+    assert explanation == "Error explaining results: overloaded"
+    assert gpt.shared_state.get(f"explanation:{result_id}") == explanation
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Unit tests for SQLCache's exact and fuzzy tiers (no Claude needed)"""
+
+from sql_cache import SQLCache, _QuestionIndex, _same_word, normalize_question
+
+SCHEMA = "Table: billing.invoices (invoice_id, customer, amount, paid)"
+UNPAID_SQL = "SELECT * FROM billing.invoices WHERE NOT paid AND customer = 'Acme Corporation'"
+
+
+def cache_with(question, sql=UNPAID_SQL):
+    cache = SQLCache(max_entries=100, similarity=0.7)
+    cache.put(question, SCHEMA, sql)
+    return cache
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    cache = cache_with("Show unpaid invoices for Acme Corporation")
+    hit = cache.get("show unpaid invoices for acme corporation?", SCHEMA)
+    assert hit is not None and hit.exact
+
+
+def test_typo_reuses_cached_sql():
+    cache = cache_with("show unpaid invoices for acme corporation")
+    hit = cache.get("show unpaid invoices for acme corporatoin", SCHEMA)
+    assert hit is not None and hit.sql == UNPAID_SQL
+
+
+def test_plural_reuses_cached_sql():
+    cache = cache_with("show unpaid invoices for acme corporation")
+    assert cache.get("show unpaid invoice for acme corporation", SCHEMA) is not None
+
+
+def test_negated_word_is_a_different_question():
+    cache = cache_with("show unpaid invoices for acme corporation")
+    assert cache.get("show paid invoices for acme corporation", SCHEMA) is None
+
+
+def test_antonym_is_a_different_question():
+    cache = cache_with("invoices sorted by amount ascending")
+    assert cache.get("invoices sorted by amount descending", SCHEMA) is None
+
+
+def test_different_number_is_a_different_question():
+    cache = cache_with("top 5 customers by amount")
+    assert cache.get("top 10 customers by amount", SCHEMA) is None
+
+
+def test_comparison_operator_is_a_different_question():
+    cache = cache_with("orders with amount > 100", "SELECT * FROM orders WHERE amount > 100")
+    assert cache.get("orders with amount < 100", SCHEMA) is None
+    assert cache.get("orders with amount >= 100", SCHEMA) is None
+    assert cache.get("orders with amount != 100", SCHEMA) is None
+
+
+def test_negative_number_is_a_different_question():
+    cache = cache_with("accounts with balance below -50")
+    assert cache.get("accounts with balance below 50", SCHEMA) is None
+
+
+def test_non_ascii_questions_keep_their_words():
+    assert normalize_question("显示所有订单") != normalize_question("显示所有客户")
+    assert normalize_question("Ventes à Zürich") == "ventes à zürich"
+    cache = cache_with("显示所有订单", "SELECT * FROM orders")
+    assert cache.get("显示所有客户", SCHEMA) is None
+    assert cache.get("显示所有订单？", SCHEMA).sql == "SELECT * FROM orders"
+
+
+def test_same_word_rules():
+    assert _same_word("corporation", "corporatoin")  # adjacent swap
+    assert _same_word("region", "regoin")
+    assert _same_word("cost", "costs")
+    assert _same_word("company", "companies")
+    assert not _same_word("paid", "unpaid")
+    assert not _same_word("active", "inactive")
+    assert not _same_word("ascending", "descending")
+    assert not _same_word("min", "max")
+    assert not _same_word("cost", "cast")  # short words must match exactly
+    assert not _same_word("regions", "reasons")  # two edits
+
+
+def test_index_rows_stay_consistent_after_removals():
+    index = _QuestionIndex()
+    questions = [f"question number {word}" for word in ("alpha", "bravo", "charlie", "delta", "echo")]
+    for question in questions:
+        index.add(question)
+    assert len(index.vectors) >= len(questions)
+    index.remove(questions[1])
+    index.remove(questions[4])
+    for question in (questions[0], questions[2], questions[3]):
+        assert index.search(question)[0] == question
+    assert sorted(index.rows) == sorted(index.questions)
+    assert all(index.questions[row] == question for question, row in index.rows.items())
+
+
+def test_eviction_keeps_the_most_recent_questions():
+    cache = SQLCache(max_entries=2, similarity=2)
+    cache.put("first question", SCHEMA, "SELECT 1")
+    cache.put("second question", SCHEMA, "SELECT 2")
+    cache.put("third question", SCHEMA, "SELECT 3")
+    assert cache.get("first question", SCHEMA) is None
+    assert cache.get("third question", SCHEMA).sql == "SELECT 3"